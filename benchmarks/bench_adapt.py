@@ -0,0 +1,62 @@
+"""Adapter resolution for shallow and deep class hierarchies."""
+from common import measure, report
+
+from pylogctx import AdapterNotFound, log_adapter
+from pylogctx.core import _adapter_mapping, adapt
+
+
+class Base(object):
+    pass
+
+
+def make_hierarchy(depth):
+    class_ = Base
+    for i in range(depth):
+        class_ = type('Level%d' % i, (class_,), {})
+    return class_
+
+
+def legacy_adapt(object_, **kwargs):
+    # Former implementation: walk the MRO on each call.
+    for class_ in object_.__class__.__mro__:
+        try:
+            adapter = _adapter_mapping[class_]
+            break
+        except KeyError:
+            continue
+    else:
+        raise AdapterNotFound("Can't log object of type %r" % type(object_))
+    return adapter(object_, **kwargs)
+
+
+def missing(adapt_, object_):
+    try:
+        adapt_(object_)
+    except AdapterNotFound:
+        pass
+
+
+def main():
+    log_adapter(Base)(lambda instance: {'base': True})
+
+    results = []
+    for depth in (0, 20):
+        instance = make_hierarchy(depth)()
+        results.extend([
+            ('mro depth %2d legacy adapt' % depth,
+             measure(lambda: legacy_adapt(instance))),
+            ('mro depth %2d adapt' % depth,
+             measure(lambda: adapt(instance))),
+        ])
+
+    orphan = type('Orphan', (object,), {})()
+    results.extend([
+        ('no adapter legacy adapt', measure(lambda: missing(legacy_adapt,
+                                                            orphan))),
+        ('no adapter adapt', measure(lambda: missing(adapt, orphan))),
+    ])
+    report('Adapter resolution', results)
+
+
+if __name__ == '__main__':
+    main()
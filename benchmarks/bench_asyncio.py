@@ -0,0 +1,68 @@
+"""Isolation and per record cost of the context across asyncio tasks."""
+from __future__ import print_function
+
+import asyncio
+import logging
+import time
+
+from common import measure, report
+
+from pylogctx import AddContextFilter, context
+from pylogctx.storage import ContextVarStorage, ThreadLocalStorage
+
+
+TASKS = 5000
+RECORDS = 10
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg', (),
+                             None)
+
+
+async def worker(i, filter_, record, leaks):
+    with context(task=i):
+        for _ in range(RECORDS):
+            await asyncio.sleep(0)
+            filter_.filter(record)
+            if record.task != i:
+                leaks.append(i)
+
+
+async def run_tasks():
+    filter_ = AddContextFilter()
+    record = make_record()
+    leaks = []
+    context.update(rid=42)
+    await asyncio.gather(*[
+        worker(i, filter_, record, leaks) for i in range(TASKS)])
+    context.clear()
+    return leaks
+
+
+def main():
+    filter_ = AddContextFilter()
+    record = make_record()
+    results = []
+    for storage in (ThreadLocalStorage(), ContextVarStorage()):
+        name = storage.__class__.__name__
+        context.storage = storage
+
+        start = time.time()
+        leaks = asyncio.run(run_tasks())
+        elapsed = time.time() - start
+        print('%s: %d tasks, %d records with a foreign context, %.3fs' % (
+            name, TASKS, len(leaks), elapsed))
+
+        context.update(rid=42, user='toto')
+        results.extend([
+            ('%s filter' % name, measure(lambda: filter_.filter(record))),
+            ('%s update' % name,
+             measure(lambda: context.update(user='titi'))),
+        ])
+        context.clear()
+    report('Per record overhead', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Eager calls per second of tasks using LoggingTask."""
+from __future__ import print_function
+
+import warnings
+
+from celery import Celery, current_task, Task
+
+from common import measure
+
+from pylogctx import context
+from pylogctx.celery import LoggingTask
+from pylogctx.compat import getargspec
+
+
+class LegacyLoggingTask(Task):
+    # Former implementation: inspect hooks and copy the context each call.
+
+    def before_call(self, *args, **kwargs):
+        pass
+
+    def after_call(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        self.save_context = context.as_dict()
+        context.clear()
+
+        arg_spec = getargspec(self.before_call)
+        if arg_spec.varargs is None:
+            warnings.warn('Method `before_call` without args is deprecated')
+            self.before_call()
+        else:
+            self.before_call(*args, **kwargs)
+
+        try:
+            context.update(current_task)
+        except Exception:
+            pass
+
+        try:
+            return super(LegacyLoggingTask, self).__call__(*args, **kwargs)
+        finally:
+            arg_spec = getargspec(self.after_call)
+            if arg_spec.varargs is None:
+                warnings.warn('Method `after_call` without args is deprecated')
+                self.after_call()
+            else:
+                self.after_call(*args, **kwargs)
+            context.clear()
+            if self.save_context:
+                context.update(**self.save_context)
+
+
+def main():
+    context.update(**dict(('field%d' % i, ['value%d' % i]) for i in range(20)))
+    print('Task calls per second')
+    for task_cls in (LegacyLoggingTask, LoggingTask):
+        app = Celery(task_cls=task_cls)
+
+        @app.task
+        def task(i):
+            return i
+
+        for name, call, number in [
+                ('eager', lambda: task.apply((1,)), 500),
+                ('direct', lambda: task(1), 5000)]:
+            seconds = measure(call, number=number)
+            print('  %-50s %10d' % (
+                '%s %s' % (task_cls.__name__, name), 1 / seconds))
+    context.clear()
+
+
+if __name__ == '__main__':
+    main()
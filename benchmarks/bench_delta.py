@@ -0,0 +1,70 @@
+"""Bytes written and CPU per record, full versus delta encoded context."""
+from __future__ import print_function
+
+import io
+import logging
+
+from common import measure, report
+
+from pylogctx import AddContextFormatter, context
+from pylogctx.delta import DeltaContextFormatter, decode
+
+
+REQUESTS = 200
+RECORDS = 20
+
+
+def trace(logger):
+    # Synthetic requests: a few records per request, in a context changing
+    # once per request and once in the middle of it.
+    for rid in range(REQUESTS):
+        with context(rid='%08x' % rid, userId=rid % 17, tenant='acme',
+                     path='/api/v1/orders/%d' % rid, method='GET',
+                     remote='10.0.%d.%d' % (rid % 256, rid % 7)):
+            for i in range(RECORDS):
+                if i == RECORDS // 2:
+                    context.update(orderId=rid * 3)
+                logger.info('step %d done', i)
+
+
+def setup(formatter):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    logger = logging.getLogger('bench.delta')
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, stream
+
+
+def main():
+    results = []
+    records = REQUESTS * RECORDS
+    for name, formatter in [
+            ('full', AddContextFormatter('%(message)s')),
+            ('delta', DeltaContextFormatter('%(message)s')),
+    ]:
+        logger, stream = setup(formatter)
+        trace(logger)
+        output = stream.getvalue()
+        print('%s: %d bytes, %.1f bytes per record' % (
+            name, len(output.encode('utf-8')),
+            len(output.encode('utf-8')) / float(records)))
+        if name == 'delta':
+            results.append((
+                'decode per record',
+                measure(lambda: list(decode(io.StringIO(output))),
+                        number=5) / records))
+
+        def run():
+            stream.seek(0)
+            stream.truncate()
+            trace(logger)
+        results.append(('%s per record' % name,
+                        measure(run, number=5) / records))
+    report('Full versus delta encoded context', results)
+
+
+if __name__ == '__main__':
+    main()
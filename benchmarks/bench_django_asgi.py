@@ -0,0 +1,72 @@
+"""Request latency through the Django middlewares under ASGI."""
+from __future__ import print_function
+
+import asyncio
+import time
+
+import django
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import path
+
+import common  # noqa: sets sys.path
+
+from pylogctx import context
+from pylogctx.storage import ContextVarStorage
+
+
+REQUESTS = 2000
+CONCURRENCY = 50
+
+
+async def view(request):
+    return JsonResponse(context.as_dict())
+
+
+urlpatterns = [path('', view)]
+
+
+def setup():
+    settings.configure(
+        DEBUG=False,
+        ALLOWED_HOSTS=['*'],
+        ROOT_URLCONF=__name__,
+        MIDDLEWARE=[],
+        PYLOGCTX_REQUEST_EXTRACTOR=lambda request: {'path': request.path},
+    )
+    django.setup()
+    context.storage = ContextVarStorage()
+
+
+async def run(client):
+    start = time.time()
+    for _ in range(REQUESTS // 10):
+        await client.get('/')
+    sequential = (time.time() - start) / (REQUESTS // 10)
+
+    async def batch():
+        for _ in range(REQUESTS // CONCURRENCY):
+            await client.get('/')
+
+    start = time.time()
+    await asyncio.gather(*[batch() for _ in range(CONCURRENCY)])
+    concurrent = (time.time() - start) / REQUESTS
+    return sequential, concurrent
+
+
+def main():
+    from django.test import AsyncClient, override_settings
+
+    setup()
+    print('%-55s %12s %12s' % ('middleware', 'latency', 'concurrent'))
+    for middleware in [
+            'pylogctx.django.ExtractRequestContextMiddleware',
+            'pylogctx.django_async.ExtractRequestContextMiddleware']:
+        with override_settings(MIDDLEWARE=[middleware]):
+            sequential, concurrent = asyncio.run(run(AsyncClient()))
+        print('%-55s %9.1f us %9.1f us' % (
+            middleware, sequential * 1e6, concurrent * 1e6))
+
+
+if __name__ == '__main__':
+    main()
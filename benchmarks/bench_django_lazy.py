@@ -0,0 +1,86 @@
+"""Requests per second with eager or deferred request adaptation."""
+from __future__ import print_function
+
+import hashlib
+import io
+import logging
+
+import django
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from common import measure
+
+from pylogctx import AddContextFormatter, Deferred, log_adapter
+from pylogctx.core import _adapter_mapping
+
+
+logger = logging.getLogger('bench')
+
+
+def lookup_user(request):
+    # Stands for a session and database lookup.
+    return hashlib.pbkdf2_hmac('sha256', b'user', b'salt', 200).hex()[:8]
+
+
+def parse_headers(request):
+    return dict(
+        (k[5:].lower(), v) for k, v in request.META.items()
+        if k.startswith('HTTP_'))
+
+
+def eager_adapter(request):
+    return {
+        'userId': lookup_user(request),
+        'headers': parse_headers(request),
+    }
+
+
+def deferred_adapter(request):
+    return {
+        'userId': Deferred(lookup_user, request),
+        'headers': Deferred(parse_headers, request),
+    }
+
+
+def view_silent(request):
+    logger.debug('Not logged')
+    return HttpResponse()
+
+
+def view_logging(request):
+    logger.info('Logged')
+    return HttpResponse()
+
+
+def main():
+    from django.test import RequestFactory
+    from pylogctx.django import OuterMiddleware
+
+    settings.configure(DEBUG=False, ALLOWED_HOSTS=['*'])
+    django.setup()
+
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(AddContextFormatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    request = RequestFactory().get(
+        '/', HTTP_USER_AGENT='bench', HTTP_ACCEPT='text/html',
+        HTTP_X_REQUEST_ID='f3b0c442')
+
+    print('Requests per second')
+    for name, adapter in [('eager', eager_adapter),
+                          ('deferred', deferred_adapter)]:
+        log_adapter(HttpRequest)(adapter)
+        for view in (view_silent, view_logging):
+            middleware = OuterMiddleware(view)
+            seconds = measure(lambda: middleware(request), number=1000)
+            print('  %-50s %10d' % (
+                '%s adapter, %s' % (name, view.__name__), 1 / seconds))
+        del _adapter_mapping[HttpRequest]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Per record cost of AddContextFilter, cached snapshot versus full merge."""
+import logging
+
+from common import measure, report
+
+from pylogctx import AddContextFilter, context
+from pylogctx.helpers import deepupdate
+
+
+FIELDS = dict(
+    ('field%d' % i, 'value%d' % i) for i in range(10)
+)
+FIELDS.update(tags=['a', 'b', 'c'], user={'id': 42, 'name': 'toto'})
+LAYERS = [{'rid': 42}, {'taskId': 'abc', 'tags': ['d']}]
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg', (),
+                             None)
+
+
+def legacy_filter(default, stack, record):
+    # Former implementation: squash every layer on each record.
+    items = {}
+    for d in reversed(stack):
+        deepupdate(items, d)
+    record.__dict__.update(dict(default, **items))
+    return True
+
+
+def main():
+    filter_ = AddContextFilter(default={'rid': None})
+    record = make_record()
+    # Same layers as the context below, top of stack first.
+    stack = list(reversed(LAYERS)) + [FIELDS]
+
+    context.update(**FIELDS)
+    with context(**LAYERS[0]), context(**LAYERS[1]):
+        results = [
+            ('legacy filter (merge each record)',
+             measure(lambda: legacy_filter({'rid': None}, stack, record))),
+            ('AddContextFilter (warm cache)',
+             measure(lambda: filter_.filter(record))),
+        ]
+    context.clear()
+    report('AddContextFilter per record', results)
+
+
+if __name__ == '__main__':
+    main()
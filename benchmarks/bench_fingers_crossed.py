@@ -0,0 +1,52 @@
+"""Cost of buffering DEBUG records per request, kept only on errors."""
+from __future__ import print_function
+
+import io
+import logging
+
+from common import measure, report
+
+from pylogctx import AddContextFormatter, context
+from pylogctx.handlers import FingersCrossedHandler
+
+
+def request(logger, rid, fail):
+    with context(rid=rid):
+        for i in range(20):
+            logger.debug('step %d', i)
+        if fail:
+            logger.error('failed')
+
+
+def main():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(AddContextFormatter('%(message)s'))
+    logger = logging.getLogger('bench.fingers_crossed')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+
+    def run():
+        for rid in range(100):
+            request(logger, rid, fail=not rid % 100)
+
+    results = []
+    logger.handlers = [target]
+    results.append(('all records written, per request',
+                    measure(run, number=10) / 100))
+    print('all records: %d bytes' % len(stream.getvalue()))
+
+    stream.seek(0)
+    stream.truncate()
+    handler = FingersCrossedHandler(target)
+    logger.handlers = [handler]
+    results.append(('fingers crossed, per request',
+                    measure(run, number=10) / 100))
+    print('fingers crossed: %d bytes' % len(stream.getvalue()))
+    handler.close()
+
+    report('Fingers crossed buffering, 1% of requests failing', results)
+
+
+if __name__ == '__main__':
+    main()
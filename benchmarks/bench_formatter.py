@@ -0,0 +1,46 @@
+"""Formatted lines per second with AddContextFormatter."""
+from __future__ import print_function
+
+import logging
+
+from common import measure
+
+from pylogctx import AddContextFormatter, LazyAccessor, context
+
+
+class Status(object):
+    value = 'running'
+
+
+class LegacyFormatter(logging.Formatter):
+    # Former implementation: render the context on each record.
+    def format(self, record):
+        msg = super(LegacyFormatter, self).format(record)
+        context_str = ' '.join([
+            '{}:{}'.format(k, v) for k, v in context.items()
+        ])
+        return '{msg} {context}'.format(msg=msg, context=context_str)
+
+
+def main():
+    record = logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg',
+                               (), None)
+    fmt = '%(levelname)s %(name)s %(message)s'
+    fields = dict(('field%d' % i, 'value%d' % i) for i in range(20))
+    context.update(rid=42, user={'id': 42, 'groups': ['a', 'b']}, **fields)
+
+    print('Formatted lines per second')
+    for lazy in (False, True):
+        if lazy:
+            context.update(status=LazyAccessor(Status(), 'value'))
+        for class_ in (LegacyFormatter, AddContextFormatter):
+            formatter = class_(fmt)
+            seconds = measure(lambda: formatter.format(record))
+            print('  %-50s %10d' % (
+                '%s%s' % (class_.__name__, ' (lazy field)' if lazy else ''),
+                1 / seconds))
+    context.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""CPU and memory of copied versus frozen values on a nested context."""
+from __future__ import print_function
+
+import tracemalloc
+
+from common import measure, report
+
+from pylogctx.core import Context
+
+
+def payload():
+    return {
+        'rid': 'f3b0c442',
+        'user': {'id': 42, 'name': 'toto', 'groups': ['admin', 'staff']},
+        'rows': tuple({'id': i, 'tags': ['t%d' % i]} for i in range(1000)),
+        'request': {'headers': {'h%d' % i: 'v%d' % i for i in range(50)},
+                    'query': {'page': ['1'], 'sort': ['name']}},
+    }
+
+
+def fill(context):
+    context.update(**payload())
+    # A few nested blocks, as in a task iterating over a batch.
+    for i in range(3):
+        context._push()
+        context.update(step=i, tags=['s%d' % i])
+        context.as_dict()
+
+
+def change_and_read(context):
+    # Change the top layer then read the context, as the first record
+    # logged after a change does.
+    context.update(tags=['x'])
+    context.remove('tags')
+    return context.as_dict()
+
+
+def block(context):
+    with context(item={'id': 1}):
+        return context.as_dict()
+
+
+def main():
+    results = []
+    fields = payload()
+    for freeze in (False, True):
+        name = 'freeze' if freeze else 'copy'
+        context = Context(freeze=freeze)
+
+        tracemalloc.start()
+        fill(context)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('%s: %.1f KiB allocated by the context' % (name, size / 1024.))
+
+        results.extend([
+            ('%s push payload' % name,
+             measure(lambda: Context(freeze=freeze).update(**fields),
+                     number=100)),
+            ('%s change and read' % name,
+             measure(lambda: change_and_read(context), number=1000)),
+            ('%s nested block' % name,
+             measure(lambda: block(context), number=1000)),
+        ])
+    report('Copied versus frozen values', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Overhead per task of the context propagating executors."""
+from __future__ import print_function
+
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import common  # noqa: sets sys.path
+
+from pylogctx import context
+from pylogctx.futures import (
+    ContextProcessPoolExecutor,
+    ContextThreadPoolExecutor,
+)
+
+
+def empty():
+    pass
+
+
+def per_task(executor, count):
+    with executor:
+        # Warm up workers.
+        executor.submit(empty).result()
+        start = time.time()
+        futures = [executor.submit(empty) for _ in range(count)]
+        for future in futures:
+            future.result()
+        return (time.time() - start) / count
+
+
+def main():
+    context.update(rid=42, user={'id': 42, 'groups': ['staff']},
+                   **dict(('field%d' % i, 'value%d' % i) for i in range(50)))
+    print('Time per empty task')
+    for class_, count in [
+            (ThreadPoolExecutor, 20000),
+            (ContextThreadPoolExecutor, 20000),
+            (ProcessPoolExecutor, 5000),
+            (ContextProcessPoolExecutor, 5000)]:
+        seconds = min(per_task(class_(max_workers=4), count)
+                      for _ in range(3))
+        print('  %-50s %10.3f us' % (class_.__name__, seconds * 1e6))
+    context.clear()
+
+
+if __name__ == '__main__':
+    main()
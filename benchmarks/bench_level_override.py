@@ -0,0 +1,39 @@
+"""Overhead of LevelOverrideFilter on traffic matching no override."""
+from __future__ import print_function
+
+import logging
+
+from common import measure, report
+
+from pylogctx import context
+from pylogctx.filters import LevelOverrideFilter
+
+
+def make_record(level):
+    return logging.LogRecord('bench', level, __file__, 1, 'msg', (), None)
+
+
+def main():
+    info = make_record(logging.INFO)
+    debug = make_record(logging.DEBUG)
+    filter_ = LevelOverrideFilter(logging.INFO, [
+        ({'userId': i}, logging.DEBUG) for i in range(100)
+    ])
+    plain = logging.Filter()
+    context.update(rid='f3b0c442', userId=1000, tenant='acme')
+
+    def changed():
+        context.update(step=1)
+        return filter_.filter(debug)
+
+    report('Level override, no matching rule', [
+        ('logging.Filter', measure(lambda: plain.filter(info))),
+        ('INFO record', measure(lambda: filter_.filter(info))),
+        ('DEBUG record', measure(lambda: filter_.filter(debug))),
+        ('DEBUG record, context changed, 100 rules',
+         measure(changed, number=1000)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Memory and CPU of a long loop growing a list, with and without limits."""
+from __future__ import print_function
+
+import tracemalloc
+
+from common import measure, report
+
+from pylogctx.core import Context
+from pylogctx.helpers import Limits
+
+
+LOOPS = 10000
+
+
+def loop(context, loops=LOOPS):
+    # A worker tagging its context on each iteration, and logging.
+    for i in range(loops):
+        context.update(tags=['item%d' % i], last='payload %d' % i)
+        context.as_dict()
+
+
+def main():
+    results = []
+    for limits in (None, Limits(max_items=100, max_value_size=64)):
+        name = 'limited' if limits else 'unbounded'
+        context = Context(limits=limits)
+
+        tracemalloc.start()
+        loop(context)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('%s: %.1f KiB held by the context after %d updates' % (
+            name, size / 1024., LOOPS))
+
+        results.append((
+            '%s update and read' % name,
+            measure(lambda: loop(context, 1), number=1000),
+        ))
+        if limits:
+            print('limits triggered: %s' % dict(limits.triggered))
+    report('Context growth over a long loop', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Nested context blocks pushing the same instance, with memoized adapter."""
+from __future__ import print_function
+
+from common import measure, report
+
+from pylogctx import context, log_adapter
+
+
+class Group(object):
+    def __init__(self, i):
+        self.name = 'group%d' % i
+
+
+class User(object):
+    def __init__(self, pk):
+        self.pk = pk
+        self.groups = [Group(i) for i in range(20)]
+
+
+class MemoizedUser(User):
+    pass
+
+
+def adapt_user(user):
+    # Walk relations and format strings, as adapters of models do.
+    return {
+        'userId': user.pk,
+        'userRepr': '<User %d>' % user.pk,
+        'groups': ','.join(sorted(
+            '%s:%s' % (user.pk, g.name) for g in user.groups)),
+    }
+
+
+def blocks(user):
+    with context(user):
+        with context(user):
+            with context(user):
+                pass
+
+
+def main():
+    log_adapter(User)(adapt_user)
+    memoized = log_adapter(MemoizedUser, memoize=True)(adapt_user)
+    user, memoized_user = User(42), MemoizedUser(42)
+    report('Three nested blocks pushing the same instance', [
+        ('adapter', measure(lambda: blocks(user))),
+        ('memoized adapter', measure(lambda: blocks(memoized_user))),
+    ])
+    print('hits: %d, misses: %d' % (memoized.hits, memoized.misses))
+
+
+if __name__ == '__main__':
+    main()
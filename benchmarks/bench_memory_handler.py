@@ -0,0 +1,51 @@
+"""Buffer then flush 10k records: per record filter versus batch annotation."""
+from __future__ import print_function
+
+import logging
+from logging.handlers import MemoryHandler
+
+from common import measure, report
+
+from pylogctx import AddContextFilter, context
+from pylogctx.handlers import ContextMemoryHandler
+
+
+RECORDS = 10000
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg', (),
+                             None)
+
+
+def fill(handler):
+    # Requests of 100 records each.
+    for rid in range(RECORDS // 100):
+        with context(rid=rid):
+            for i in range(100):
+                handler.handle(make_record())
+
+
+def main():
+    context.update(**dict(('field%d' % i, 'value%d' % i) for i in range(50)))
+    target = logging.NullHandler()
+    legacy = MemoryHandler(RECORDS + 1, target=target)
+    legacy.addFilter(AddContextFilter())
+    results = []
+    for name, handler in [
+            ('MemoryHandler + AddContextFilter', legacy),
+            ('ContextMemoryHandler', ContextMemoryHandler(
+                RECORDS + 1, target=target)),
+            ('ContextMemoryHandler zero_copy', ContextMemoryHandler(
+                RECORDS + 1, target=target, zero_copy=True)),
+    ]:
+        def run():
+            fill(handler)
+            handler.flush()
+        results.append((name, measure(run, number=1, repeat=5)))
+    report('Buffer and flush %d records, 50 context fields' % RECORDS,
+           results)
+
+
+if __name__ == '__main__':
+    main()
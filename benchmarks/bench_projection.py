@@ -0,0 +1,43 @@
+"""ProjectionFilter versus AddContextFilter on a context of 500 keys."""
+from __future__ import print_function
+
+import logging
+
+from common import measure, report
+
+from pylogctx import AddContextFilter, context
+from pylogctx.filters import ProjectionFilter
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg', (),
+                             None)
+
+
+def main():
+    context.update(**dict(('field%d' % i, 'value%d' % i) for i in range(500)))
+    context.update(rid='f3b0c442', user={'id': 42, 'name': 'toto'})
+    context._push()
+    context.update(step=1)
+
+    filters = [
+        ('AddContextFilter', AddContextFilter()),
+        ('ProjectionFilter', ProjectionFilter(
+            ['rid', 'user.id', 'step', 'field10'])),
+    ]
+    results = []
+    for name, filter_ in filters:
+        record = make_record()
+        results.append(('%s unchanged context' % name,
+                        measure(lambda: filter_.filter(record))))
+
+        def changed(step=iter(range(10 ** 9))):
+            context.update(step=next(step))
+            return filter_.filter(record)
+        results.append(('%s changed context' % name,
+                        measure(changed, number=1000)))
+    report('Projection of 4 keys out of 500', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Throughput of logging through a queue from many threads."""
+from __future__ import print_function
+
+import io
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+import common  # noqa: sets sys.path
+
+from pylogctx import AddContextFormatter, context
+from pylogctx.handlers import ContextQueueHandler, ContextQueueListener
+
+
+THREADS = 8
+RECORDS = 5000
+
+
+def run(handler_class, listener_class):
+    logger = logging.getLogger('bench.queue')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    records = queue.Queue()
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(AddContextFormatter('%(message)s'))
+    listener = listener_class(records, target)
+    logger.handlers = [handler_class(records)]
+
+    def worker(rid):
+        context.update(rid=rid, **dict(
+            ('field%d' % i, i) for i in range(20)))
+        for i in range(RECORDS):
+            logger.info('%s', rid)
+
+    listener.start()
+    start = time.time()
+    threads = [threading.Thread(target=worker, args=(rid,))
+               for rid in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    listener.stop()
+    elapsed = time.time() - start
+
+    misattributed = sum(
+        1 for line in stream.getvalue().splitlines()
+        if ' rid:%s ' % line.split()[0] not in line + ' ')
+    return THREADS * RECORDS / elapsed, misattributed
+
+
+def main():
+    print('%-50s %12s %14s' % ('', 'records/s', 'misattributed'))
+    for handler_class, listener_class in [
+            (QueueHandler, QueueListener),
+            (ContextQueueHandler, ContextQueueListener)]:
+        throughput, misattributed = run(handler_class, listener_class)
+        print('%-50s %12d %14d' % (
+            handler_class.__name__, throughput, misattributed))
+
+
+if __name__ == '__main__':
+    main()
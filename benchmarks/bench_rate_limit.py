@@ -0,0 +1,61 @@
+"""Throughput of RateLimitFilter, per key count and thread count."""
+from __future__ import print_function
+
+import logging
+import threading
+import time
+
+from common import measure, report
+
+from pylogctx import context
+from pylogctx.filters import RateLimitFilter
+
+
+RECORDS = 20000
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.WARNING, __file__, 1, 'msg', (),
+                             None)
+
+
+def flood(filter_, rid):
+    record = make_record()
+    with context(rid=rid):
+        for i in range(RECORDS):
+            filter_.filter(record)
+
+
+def main():
+    results = []
+    filter_ = RateLimitFilter(keys=('rid',), rate=10, max_keys=100)
+    filter_.summary_logger.addHandler(logging.NullHandler())
+    filter_.summary_logger.propagate = False
+    record = make_record()
+    context.update(rid='f3b0c442')
+    results.append(('single key', measure(lambda: filter_.filter(record))))
+
+    def churn(rids=iter(range(10 ** 9))):
+        context.update(rid=next(rids))
+        return filter_.filter(record)
+    results.append(('new key each record, 100 keys kept',
+                    measure(churn, number=1000)))
+    context.clear()
+
+    for threads in (1, 4, 8):
+        workers = [threading.Thread(target=flood, args=(filter_, i))
+                   for i in range(threads)]
+        start = time.time()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.time() - start
+        results.append(('%d threads, per record' % threads,
+                        elapsed / (threads * RECORDS)))
+    filter_.close()
+    report('Context keyed rate limiting', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Save, clean and restore the context: copies versus snapshot tokens."""
+from __future__ import print_function
+
+from common import measure, report
+
+from pylogctx import context
+
+
+def legacy():
+    # Former way: copy the context out, then copy it back in.
+    saved = context.as_dict()
+    context.clear()
+    context.update(step=1)
+    context.clear()
+    context.update(**saved)
+
+
+def tokens():
+    saved = context.snapshot()
+    context.restore()
+    context.update(step=1)
+    context.restore(saved)
+
+
+def isolated():
+    with context.isolated():
+        context.update(step=1)
+
+
+def main():
+    results = []
+    for size in (10, 100, 1000):
+        context.clear()
+        context.update(**dict(('field%d' % i, ['value%d' % i])
+                              for i in range(size)))
+        for name, func in [('legacy', legacy), ('snapshot/restore', tokens),
+                           ('isolated', isolated)]:
+            results.append(('%s size=%d' % (name, size),
+                            measure(func, number=1000)))
+    report('Run a block in a clean context', results)
+
+
+if __name__ == '__main__':
+    main()
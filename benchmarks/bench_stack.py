@@ -0,0 +1,55 @@
+"""Cost of context managers and lookups depending on the stack depth."""
+from common import measure, report
+
+from pylogctx import context
+from pylogctx.helpers import deepupdate
+
+
+DEPTHS = (1, 10, 100, 1000)
+
+
+def legacy_push_pop(stack):
+    # Former implementation: the top of the stack is the head of a list.
+    stack.insert(0, {})
+    deepupdate(stack[0], {'x': 1})
+    stack.pop(0)
+
+
+def legacy_get(stack, key):
+    items = {}
+    for d in reversed(stack):
+        deepupdate(items, d)
+    return items.get(key)
+
+
+def push_pop():
+    with context(x=1):
+        pass
+
+
+def main():
+    results = []
+    for depth in DEPTHS:
+        cms = [context(level=i, tags=['t%d' % i]) for i in range(depth)]
+        for cm in cms:
+            cm.__enter__()
+        stack = [{'level': i, 'tags': ['t%d' % i]} for i in range(depth)]
+
+        results.extend([
+            ('depth %4d legacy push/pop' % depth,
+             measure(lambda: legacy_push_pop(stack), number=1000)),
+            ('depth %4d push/pop' % depth,
+             measure(push_pop, number=1000)),
+            ('depth %4d legacy get' % depth,
+             measure(lambda: legacy_get(stack, 'level'), number=100)),
+            ('depth %4d get' % depth,
+             measure(lambda: context.get('level'), number=1000)),
+        ])
+
+        for cm in reversed(cms):
+            cm.__exit__(None, None, None)
+    report('Context stack by depth', results)
+
+
+if __name__ == '__main__':
+    main()
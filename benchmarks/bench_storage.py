@@ -0,0 +1,82 @@
+"""Throughput of each context storage with many concurrent workers."""
+from __future__ import print_function
+
+import asyncio
+import threading
+import time
+
+import greenlet
+
+import common  # noqa: F401, adds pylogctx to sys.path
+
+from pylogctx.core import Context
+from pylogctx.storage import (
+    ContextVarStorage, GreenletStorage, ThreadLocalStorage,
+)
+
+
+WORKERS = 200
+OPERATIONS = 500
+
+
+def worker(context, i):
+    # A request: a context block per operation, read by a record each.
+    context.update(rid=i)
+    for step in range(OPERATIONS):
+        with context(step=step):
+            context.as_dict()
+        yield
+
+
+def run_threads(context):
+    def run(i):
+        for _ in worker(context, i):
+            pass
+    threads = [threading.Thread(target=run, args=(i,))
+               for i in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_greenlets(context):
+    def run(i):
+        for _ in worker(context, i):
+            greenlet.getcurrent().parent.switch()
+    greenlets = [greenlet.greenlet(run) for i in range(WORKERS)]
+    for i, greenlet_ in enumerate(greenlets):
+        greenlet_.switch(i)
+    while not all(greenlet_.dead for greenlet_ in greenlets):
+        for greenlet_ in greenlets:
+            if not greenlet_.dead:
+                greenlet_.switch()
+
+
+def run_tasks(context):
+    async def run(i):
+        for _ in worker(context, i):
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(*[run(i) for i in range(WORKERS)])
+    asyncio.run(main())
+
+
+def main():
+    print('%d workers, %d blocks each' % (WORKERS, OPERATIONS))
+    for name, storage, runner in [
+            ('thread', ThreadLocalStorage, run_threads),
+            ('contextvars', ContextVarStorage, run_tasks),
+            ('greenlet', GreenletStorage, run_greenlets),
+    ]:
+        context = Context(storage=storage())
+        start = time.time()
+        runner(context)
+        elapsed = time.time() - start
+        print('  %-50s %10.0f blocks/s' % (
+            name, WORKERS * OPERATIONS / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Memory and CPU per record of AddContextFilter, copy versus zero copy."""
+from __future__ import print_function
+
+import logging
+import tracemalloc
+
+from common import measure, report
+
+from pylogctx import AddContextFilter, context
+
+
+RECORDS = 1000
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg', (),
+                             None)
+
+
+def retained(filter_):
+    # Memory held per record, beyond the record itself.
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    records = [make_record() for _ in range(RECORDS)]
+    bare, _ = tracemalloc.get_traced_memory()
+    for record in records:
+        filter_.filter(record)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - bare) / float(RECORDS)
+
+
+def main():
+    results = []
+    for size in (5, 50, 500):
+        context.update(**dict(('field%d' % i, i) for i in range(size)))
+        for zero_copy in (False, True):
+            name = '%3d keys %s' % (size, 'zero copy' if zero_copy else 'copy')
+            filter_ = AddContextFilter(zero_copy=zero_copy)
+            print('%-30s %8.0f bytes/record' % (name, retained(filter_)))
+            results.append((name, measure(
+                lambda: filter_.filter(make_record()), number=2000)))
+        context.clear()
+    report('AddContextFilter on a new record', results)
+
+
+if __name__ == '__main__':
+    main()
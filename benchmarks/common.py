@@ -0,0 +1,21 @@
+"""Helpers shared by the pylogctx benchmarks."""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+# Allow running benchmarks from a checkout without installing pylogctx.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def measure(func, number=10000, repeat=5):
+    """Return the best time per call of `func`, in seconds."""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(title, results):
+    print(title)
+    for name, seconds in results:
+        print('  %-50s %10.3f us' % (name, seconds * 1e6))
@@ -0,0 +1,286 @@
+"""
+Benchmark suite of pylogctx hot paths.
+
+Run ``python benchmarks/suite.py --save benchmarks/baseline.json`` to record a
+baseline, then ``python benchmarks/suite.py --compare
+benchmarks/baseline.json`` to flag benchmarks slower than the baseline.
+
+Timings are recorded relative to a reference benchmark of the standard
+library, run in the same process, so that a baseline recorded on another
+machine still applies.
+"""
+from __future__ import print_function
+
+import argparse
+from functools import partial
+import json
+import logging
+import sys
+import threading
+import time
+
+from common import measure
+
+from pylogctx import (
+    AddContextFilter, AddContextFormatter, context, log_adapter,
+)
+from pylogctx.core import _adapter_mapping, adapt
+from pylogctx.helpers import deepupdate
+
+
+REFERENCE = 'reference LogRecord()'
+SIZES = (10, 100)
+DEPTHS = (1, 10, 50)
+THREADS = (1, 4, 8)
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def make_record():
+    return logging.LogRecord('bench', logging.INFO, __file__, 1, 'msg', (),
+                             None)
+
+
+def make_fields(size):
+    fields = dict(('field%d' % i, 'value%d' % i) for i in range(size - 2))
+    fields.update(tags=['a', 'b'], user={'id': 42, 'groups': ['staff']})
+    return fields
+
+
+class filled(object):
+    # Fill the context of the current thread with size fields spread over
+    # depth layers.
+    def __init__(self, size, depth=1):
+        self.size = size
+        self.depth = depth
+
+    def __enter__(self):
+        context.update(**make_fields(self.size))
+        for i in range(self.depth - 1):
+            context._push()
+            context.update(level=i, tags=['l%d' % i])
+
+    def __exit__(self, *exc_info):
+        for i in range(self.depth - 1):
+            context._pop()
+        context.clear()
+
+
+@benchmark
+def reference():
+    # Timings are divided by the timing of this standard library workload.
+    yield REFERENCE, partial(measure, make_record, repeat=15)
+
+
+@benchmark
+def as_dict():
+    for size in SIZES:
+        for depth in DEPTHS:
+            with filled(size, depth):
+                yield ('as_dict warm size=%d depth=%d' % (size, depth),
+                       partial(measure, context.as_dict))
+
+                def changed():
+                    context.update(step=1)
+                    return context.as_dict()
+                yield ('as_dict changed size=%d depth=%d' % (size, depth),
+                       partial(measure, changed, number=1000))
+
+
+@benchmark
+def deepupdate_():
+    for size in SIZES:
+        src = make_fields(size)
+        yield ('deepupdate new size=%d' % size,
+               partial(measure, lambda: deepupdate({}, src), number=1000))
+        target = make_fields(size)
+        yield ('deepupdate merge size=%d' % size, partial(
+            measure, lambda: deepupdate(target, {'user': {'id': 1}})))
+
+
+@benchmark
+def adapt_():
+    class Model(object):
+        pass
+
+    class Deep(Model):
+        pass
+
+    for i in range(10):
+        Deep = type('Deep%d' % i, (Deep,), {})
+
+    log_adapter(Model)(lambda instance: {'model': 1})
+    try:
+        instance = Deep()
+        yield 'adapt mro=%d' % len(Deep.__mro__), partial(
+            measure, lambda: adapt(instance))
+    finally:
+        del _adapter_mapping[Model]
+
+
+@benchmark
+def context_managers():
+    class Model(object):
+        pass
+    log_adapter(Model)(lambda instance: {'model': 1})
+    instance = Model()
+
+    def update():
+        with context(item=1):
+            pass
+
+    def update_one():
+        with context.cm_update_one(instance):
+            pass
+
+    try:
+        for depth in DEPTHS:
+            with filled(10, depth):
+                yield ('context() depth=%d' % depth,
+                       partial(measure, update, number=2000))
+                yield ('cm_update_one() depth=%d' % depth,
+                       partial(measure, update_one, number=2000))
+    finally:
+        del _adapter_mapping[Model]
+
+
+@benchmark
+def filter_():
+    record = make_record()
+    for size in SIZES:
+        with filled(size):
+            for zero_copy in (False, True):
+                filter_ = AddContextFilter(zero_copy=zero_copy)
+                name = 'AddContextFilter size=%d zero_copy=%s' % (
+                    size, zero_copy)
+                yield name, partial(measure, lambda: filter_.filter(record))
+
+
+@benchmark
+def formatter():
+    record = make_record()
+    formatter = AddContextFormatter()
+    for size in SIZES:
+        with filled(size):
+            yield ('AddContextFormatter size=%d' % size,
+                   partial(measure, lambda: formatter.format(record)))
+
+
+@benchmark
+def threads():
+    # Records per second filtered by each thread, with all threads logging.
+    count = 2000
+
+    def worker(filter_, results):
+        record = make_record()
+        with filled(10):
+            start = time.time()
+            for _ in range(count):
+                filter_.filter(record)
+            results.append(time.time() - start)
+
+    def run_threads(thread_count):
+        filter_ = AddContextFilter()
+        results = []
+        workers = [threading.Thread(target=worker, args=(filter_, results))
+                   for _ in range(thread_count)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return max(results) / count
+
+    for thread_count in THREADS:
+        yield ('AddContextFilter threads=%d' % thread_count,
+               partial(run_threads, thread_count))
+
+
+@benchmark
+def celery_task():
+    try:
+        from celery import Celery
+    except ImportError:
+        return
+    from pylogctx.celery import LoggingTask
+
+    app = Celery(task_cls=LoggingTask)
+
+    @app.task
+    def task(i):
+        return i
+
+    with filled(10):
+        yield 'LoggingTask eager call', partial(
+            measure, lambda: task.apply((1,)), number=200)
+        yield 'LoggingTask direct call', partial(
+            measure, lambda: task(1), number=2000)
+
+
+def run(pattern=None):
+    """
+    Return the timings of benchmarks whose name contains `pattern`, relative
+    to the reference benchmark.
+    """
+    results = {}
+    reference = None
+    for func in BENCHMARKS:
+        # Benchmarks yield their name and a function measuring them, so that
+        # filtered out benchmarks are not run.
+        for name, measure_ in func():
+            if name != REFERENCE and pattern and pattern not in name:
+                continue
+            seconds = measure_()
+            if reference is None:
+                reference = seconds
+            results[name] = seconds / reference
+            print('%-50s %10.3f us %8.2fx' % (
+                name, seconds * 1e6, seconds / reference))
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, relative in sorted(results.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = relative / reference
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    for name, ratio in regressions:
+        print('REGRESSION %-50s %5.2fx slower' % (name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--save', metavar='FILE',
+                        help='save results as baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare results to baseline')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='relative slowdown flagged as regression')
+    parser.add_argument('--filter', metavar='PATTERN',
+                        help='keep only benchmarks whose name contains this')
+    args = parser.parse_args(argv)
+
+    results = run(args.filter)
+    if args.save:
+        with open(args.save, 'w') as fo:
+            json.dump(results, fo, indent=2, sort_keys=True)
+            fo.write('\n')
+    if args.compare:
+        with open(args.compare) as fo:
+            baseline = json.load(fo)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -59,6 +59,7 @@ setup(
         'mock>=2.0.0',
         'pytest>=2.9.0',
         'celery',
+        'greenlet',
         'six'
     ],
 )
@@ -2,18 +2,22 @@ from .core import (
     AdapterNotFound,
     AddContextFilter,
     AddContextFormatter,
+    Deferred,
     ExcInfoFilter,
     LazyAccessor,
     context,
     log_adapter,
 )
+from .helpers import Limits
 
 __all__ = [
     'AdapterNotFound',
     'AddContextFilter',
     'AddContextFormatter',
+    'Deferred',
     'ExcInfoFilter',
     'LazyAccessor',
+    'Limits',
     'context',
     'log_adapter',
 ]
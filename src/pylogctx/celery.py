@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import json
 import logging
 import warnings
 
@@ -8,12 +9,65 @@ from celery import Task
 
 from .compat import getargspec
 from .core import context
+from .jsonlog import json_default
 
 
 logger = logging.getLogger(__name__)
 
+# Whether a hook accepts the task arguments, by task class and hook name.
+_hook_takes_args = {}
+
 
 class LoggingTask(Task):
+    # Context fields sent along with the task to the worker.
+    context_headers = ()
+    # Maximum size of the fields sent, once encoded. Fields which do not fit
+    # are not sent.
+    context_headers_max_size = 1024
+
+    def apply_async(self, args=None, kwargs=None, **options):
+        if self.context_headers:
+            encoded = self._encode_context()
+            if encoded:
+                options['headers'] = dict(
+                    options.get('headers') or {}, pylogctx=encoded)
+        return super(LoggingTask, self).apply_async(args, kwargs, **options)
+
+    def _encode_context(self):
+        # Encode fields in compact JSON, in the order of context_headers.
+        size = 2  # braces
+        fragments = []
+        for key in self.context_headers:
+            value = context.get(key)
+            if value is None:
+                continue
+            fragment = '%s:%s' % (
+                json.dumps(key),
+                json.dumps(value, separators=(',', ':'), default=json_default),
+            )
+            if size + len(fragment) + 1 > self.context_headers_max_size:
+                logger.debug('Context field %s too large to be sent.', key)
+                continue
+            size += len(fragment) + 1
+            fragments.append(fragment)
+        if fragments:
+            return '{%s}' % ','.join(fragments)
+
+    def _received_context(self):
+        # Custom headers are in request headers for eager tasks, and request
+        # attributes in workers.
+        request = self.request
+        headers = getattr(request, 'headers', None) or {}
+        encoded = headers.get('pylogctx') or getattr(request, 'pylogctx', None)
+        if not encoded:
+            return {}
+        try:
+            fields = json.loads(encoded)
+        except ValueError as e:
+            logger.debug('Failed to decode received log context: %r', e)
+            return {}
+        return dict(
+            (k, v) for k, v in fields.items() if k in self.context_headers)
 
     def before_call(self, *args, **kwargs):
         # Override if you need to add some vars or log something.
@@ -23,19 +77,31 @@ class LoggingTask(Task):
         # Override if you need to add some vars or log something.
         pass
 
+    def _call_hook(self, name, args, kwargs):
+        hook = getattr(self, name)
+        key = (self.__class__, name)
+        try:
+            takes_args = _hook_takes_args[key]
+        except KeyError:
+            takes_args = _hook_takes_args[key] = (
+                getargspec(hook).varargs is not None)
+
+        if takes_args:
+            hook(*args, **kwargs)
+        else:
+            # To keep breaking compat
+            warnings.warn('Method `%s` without args is deprecated' % name)
+            hook()
+
     def __call__(self, *args, **kwargs):
         # Save context to put in back at the end. Useful when a task call
         # another task to avoid context from another task.
-        self.save_context = context.as_dict()
-        context.clear()
+        saved_context = context.snapshot()
+        context.restore()
+        if self.context_headers:
+            context.update(**self._received_context())
 
-        arg_spec = getargspec(self.before_call)
-        if arg_spec.varargs is None:
-            # To keep breaking compat
-            warnings.warn('Method `before_call` without args is deprecated')
-            self.before_call()
-        else:
-            self.before_call(*args, **kwargs)
+        self._call_hook('before_call', args, kwargs)
 
         task = current_task
 
@@ -44,16 +110,14 @@ class LoggingTask(Task):
         except Exception as e:
             logger.debug('Failed to push task to log context: %r', e)
 
+        context.enter_scope()
         try:
             return super(LoggingTask, self).__call__(*args, **kwargs)
         finally:
-            arg_spec = getargspec(self.after_call)
-            if arg_spec.varargs is None:
-                # To keep breaking compat
-                warnings.warn('Method `after_call` without args is deprecated')
-                self.after_call()
-            else:
-                self.after_call(*args, **kwargs)
-            context.clear()
-            if self.save_context:
-                context.update(**self.save_context)
+            try:
+                self._call_hook('after_call', args, kwargs)
+            finally:
+                try:
+                    context.exit_scope()
+                finally:
+                    context.restore(saved_context)
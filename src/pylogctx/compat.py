@@ -8,3 +8,15 @@ def getargspec(callable):
     except AttributeError:
         # Python 2
         return inspect.getargspec(callable)
+
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping  # noqa
+
+
+try:
+    string_types = (unicode, bytes)  # noqa
+except NameError:  # Python 3
+    string_types = (str, bytes)
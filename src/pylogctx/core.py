@@ -1,31 +1,276 @@
 from __future__ import unicode_literals
 
+import collections
+import functools
 import itertools
 import logging
 import threading
+import time
+import weakref
 
-from .helpers import deepupdate
+from .helpers import (
+    _copy_container, copycontainers, deepupdate, frozenupdate, FrozenDict,
+    FrozenList, FrozenSet,
+)
+from .storage import ThreadLocalStorage, get_storage
 
 
 _log = logging.getLogger(__name__)
 
+# Versions are drawn from a process wide counter so that a version is never
+# reused, even when a thread local stack is dropped and rebuilt.
+_versions = itertools.count()
+
+_unset = object()
+
+
+def _merge(base, fields):
+    # Merge fields over a copy of base. Only the containers deepupdate is
+    # about to modify in place are copied, other values are shared.
+    items = dict(base)
+    shared = {}
+    for k, v in fields.items():
+        if items.get(k) is not None and isinstance(v, (list, dict, set)):
+            shared[k] = items.pop(k)
+    deepupdate(items, shared)
+    deepupdate(items, fields)
+    return items
+
+
+class _Layer(object):
+    """
+    A level of the context stack.
+
+    Layers are chained from the top of the stack to the bottom, so pushing
+    and popping a level does not depend on the depth of the stack. Each layer
+    caches the merge of its fields over the layers below.
+
+    Only the top layer of a stack is modified in place. A layer with a layer
+    pushed over it is sealed, so that merges cached above it stay valid, and
+    unsealed when that layer is popped. Layers referenced by a snapshot are
+    pinned: they stay sealed for good.
+    """
+    __slots__ = ('parent', 'fields', 'sealed', 'pinned', 'version',
+                 '_merged', '_merged_containers', '_resolved')
+
+    # Values merged with the values below them instead of overriding them.
+    containers = (list, dict, set)
+    update = staticmethod(deepupdate)
+
+    def __init__(self, parent=None, fields=None):
+        self.parent = parent
+        self.fields = {} if fields is None else fields
+        self.sealed = False
+        self.pinned = False
+        self.touch()
+
+    def touch(self):
+        self.version = next(_versions)
+        self._merged = None
+        self._merged_containers = None
+        self._resolved = None
+
+    def copy(self):
+        # Same content, thus same version and merge.
+        layer = self.__class__(self.parent, self._copy_fields())
+        layer.version = self.version
+        layer._merged = self._merged
+        layer._merged_containers = self._merged_containers
+        layer._resolved = self._resolved
+        return layer
+
+    def _copy_fields(self):
+        return self._copy_items(self.fields)
+
+    # Copy items so that changing the copy leaves the original untouched.
+    # Only containers can be changed in place: other values are shared.
+    _copy_items = staticmethod(copycontainers)
+
+    _merge = staticmethod(_merge)
+
+    def merged(self):
+        if self._merged is None:
+            # Walk down to the first merged layer then merge back up, rather
+            # than recursing through deep stacks.
+            pending = []
+            layer = self
+            while layer is not None and layer._merged is None:
+                pending.append(layer)
+                layer = layer.parent
+            items = {} if layer is None else layer._merged
+            for layer in reversed(pending):
+                items = layer._merged = layer._merge(items, layer.fields)
+        return self._merged
+
+    def merged_copy(self):
+        # Copy of merged(). Keys holding containers are cached with the merge,
+        # so that other values are shared without looking at them.
+        merged = self.merged()
+        keys = self._merged_containers
+        if keys is None:
+            keys = self._merged_containers = [
+                k for k, v in merged.items() if isinstance(v, self.containers)]
+        copied = dict(merged)
+        for k in keys:
+            copied[k] = _copy_container(merged[k])
+        return copied
+
+    def get(self, key, default):
+        # Resolve key through the layers, down to a layer which resolved it
+        # already or to the first value which overrides the ones below. The
+        # value is then cached on each layer walked, until it changes, so
+        # that lookups do not depend on the depth of the stack.
+        pending = []
+        value = _unset
+        layer = self
+        while layer is not None:
+            if layer._merged is not None:
+                value = layer._merged.get(key, _unset)
+                break
+            resolved = layer._resolved
+            if resolved is not None and key in resolved:
+                value = resolved[key]
+                break
+            pending.append(layer)
+            field = layer.fields.get(key, _unset)
+            if field is not _unset and not isinstance(field, self.containers):
+                break
+            layer = layer.parent
+
+        for layer in reversed(pending):
+            field = layer.fields.get(key, _unset)
+            if field is _unset:
+                pass
+            elif not isinstance(field, self.containers):
+                value = field
+            else:
+                base = {} if value is _unset else {key: value}
+                value = self._merge(base, {key: field})[key]
+            if layer._resolved is None:
+                layer._resolved = {}
+            layer._resolved[key] = value
+
+        return default if value is _unset else value
+
+
+class _FrozenLayer(_Layer):
+    """
+    A layer storing frozen values.
+
+    Values are frozen once when pushed, then shared by copies and merges
+    instead of being deep copied.
+    """
+    __slots__ = ()
+
+    containers = (FrozenList, FrozenDict, FrozenSet)
+    update = staticmethod(frozenupdate)
+
+    def _copy_fields(self):
+        return dict(self.fields)
+
+    @staticmethod
+    def _copy_items(items):
+        # Frozen values can not be changed: they are shared.
+        return dict(items)
+
+    def merged_copy(self):
+        return dict(self.merged())
+
+    @staticmethod
+    def _merge(base, fields):
+        items = dict(base)
+        frozenupdate(items, fields)
+        return items
+
+
+class Context(object):
+    def __init__(self, storage=None, freeze=False, limits=None):
+        # Where the stack of each worker is stored: a storage of
+        # pylogctx.storage or its name.
+        self.storage = get_storage(storage or ThreadLocalStorage())
+        # Whether to freeze values when pushed, rather than copy them on each
+        # change. Values are then immutable: lists, sets and dicts are stored
+        # as FrozenList, FrozenSet and FrozenDict.
+        self.freeze = freeze
+        # Optional Limits bounding the records of each level of the stack.
+        self.limits = limits
+        # Objects notified when a scope, like a context block, a request or a
+        # task, starts and ends.
+        self.scope_listeners = ()
+
+    @property
+    def _layer_class(self):
+        return _FrozenLayer if self.freeze else _Layer
+
+    def set_storage(self, storage):
+        """
+        Store contexts in storage, a storage of pylogctx.storage or its name:
+        'thread', 'contextvars' or 'greenlet'.
+
+        Contexts stored in the former storage are dropped: configure the
+        storage before using the context, and before creating handlers and
+        filters following scopes.
+        """
+        self.storage = get_storage(storage)
+
+    def _layer(self):
+        # Layers are not initialized upon init on object (which is shared) but
+        # on first access *in* thread or task.
+        layer = self.storage.get()
+        if layer is None:
+            layer = self._layer_class()
+            self.storage.set(layer)
+        return layer
+
+    def _writable(self):
+        layer = self._layer()
+        if layer.sealed or self.storage.shared:
+            layer = layer.copy()
+            self.storage.set(layer)
+        return layer
+
+    # Kept for code resetting the context with `del context._stack`.
+    @property
+    def _stack(self):
+        return self._layer()
+
+    @_stack.deleter
+    def _stack(self):
+        self.storage.set(None)
 
-class Context(threading.local):
     @property
     def data(self):
-        # Since we are local, the property is not initialize upon init on
-        # object (which is shared) but on first access *in* thread.
-        try:
-            self._stack
-        except AttributeError:
-            self._stack = [{}]
-        return self._stack[0]
+        """
+        Records of the top of the stack.
+
+        Reading this property counts as a change of the context, so that
+        cached merges are dropped. Changes made later through a reference
+        kept to the dict are not seen: read the property again for each
+        change.
+        """
+        layer = self._writable()
+        layer.touch()
+        return layer.fields
+
+    @property
+    def version(self):
+        """
+        Opaque number identifying the content of the context of this thread.
+
+        It changes each time the context is modified.
+        """
+        return self._layer().version
 
     def clear(self):
         """
         Drop all records
         """
-        self.data.clear()
+        layer = self._layer()
+        if layer.sealed or self.storage.shared:
+            self.storage.set(self._layer_class(layer.parent))
+        else:
+            layer.fields.clear()
+            layer.touch()
 
     def update(self, *objects, **fields):
         """
@@ -41,7 +286,12 @@ class Context(threading.local):
             log_context.update(Request, Task)
             log_context.update(Request, userId=2, articleId=4)
         """
-        deepupdate(self.data, fields)
+        layer = self._writable()
+        try:
+            layer.update(layer.fields, fields, self.limits)
+        finally:
+            # Even a failed update may have changed some fields.
+            layer.touch()
 
         for object_ in objects:
             if not object_:
@@ -63,7 +313,13 @@ class Context(threading.local):
             log_context.update(Request)
             log_context.update(Request, full_logs=True, display=True, ...)
         """
-        deepupdate(self.data, adapt(object_, **adapter_kw))
+        fields = adapt(object_, **adapter_kw)
+        layer = self._writable()
+        try:
+            layer.update(layer.fields, fields, self.limits)
+        finally:
+            # Even a failed update may have changed some fields.
+            layer.touch()
 
     def remove(self, *keys):
         """
@@ -74,26 +330,109 @@ class Context(threading.local):
         return self.remove_many(keys)
 
     def remove_many(self, keys):
-        for k in keys:
-            try:
-                self.data.pop(k)
-            except KeyError:
-                pass
+        layer = self._writable()
+        try:
+            for k in keys:
+                try:
+                    layer.fields.pop(k)
+                except KeyError:
+                    pass
+        finally:
+            layer.touch()
+
+    def get(self, key, default=None):
+        """
+        Return the value of a record, merged across the stack.
+
+        The value is shared with the context and must not be modified.
+        """
+        return self._layer().get(key, default)
+
+    def snapshot(self):
+        """
+        Return an opaque token of the current context, for restore().
+
+        The token does not change, whatever is done with the context
+        afterwards.
+        """
+        layer = self._layer()
+        # Pin the layers down to the first one already pinned, so that none
+        # is modified in place once popped.
+        pinned = layer
+        while pinned is not None and not pinned.pinned:
+            pinned.sealed = pinned.pinned = True
+            pinned = pinned.parent
+        return layer
+
+    def restore(self, token=None):
+        """
+        Reinstate a context saved by snapshot(), or an empty context.
+        """
+        self.storage.set(token)
+
+    def isolated(self, token=None):
+        """
+        Run a block in the context of a snapshot() token, or in an empty
+        context, then restore the current context.
+
+        Usage:
+        .. code-block:: python
+
+            with log_context.isolated():
+                log_context.update(rid=42)
+        """
+        return IsolatedContextManager(self, token)
+
+    def add_scope_listener(self, listener):
+        """
+        Call `listener.enter_scope()` and `listener.exit_scope()` when a scope
+        starts and ends.
+
+        Scopes are context blocks, requests and tasks. Scopes nest: a listener
+        tracks the depth itself.
+        """
+        self.scope_listeners = self.scope_listeners + (listener,)
+
+    def remove_scope_listener(self, listener):
+        self.scope_listeners = tuple(
+            registered for registered in self.scope_listeners
+            if registered is not listener)
+
+    def enter_scope(self):
+        for listener in self.scope_listeners:
+            listener.enter_scope()
+
+    def exit_scope(self):
+        for listener in reversed(self.scope_listeners):
+            listener.exit_scope()
+
+    def _push(self):
+        layer = self._layer()
+        layer.sealed = True
+        self.storage.set(self._layer_class(layer))
+
+    def _pop(self):
+        parent = self._layer().parent
+        if parent is not None and not parent.pinned:
+            # Nothing references the popped layer anymore: the parent can be
+            # modified in place again.
+            parent.sealed = False
+        self.storage.set(parent)
+
+    def _merged(self):
+        # Return the squashed stack, cached until the context changes. The
+        # returned dict is shared: callers must not modify it.
+        return self._layer().merged()
 
     def as_dict(self):
         """
         Return the context as a dict.
-        """
-        # Ensure thread local data is ready
-        self.data
 
-        items = {}
-        # Squash all dict in stack and reverse order because
-        # the first values in stack are the last inserted values and we need
-        # to override values with the last inserted
-        for d in reversed(self._stack):
-            deepupdate(items, d)
-        return items
+        The dict is a copy: changing it, or the lists, sets and dicts it
+        holds, leaves the context untouched. Other values, and frozen ones,
+        are shared.
+        """
+        return self._layer().merged_copy()
 
     def items(self):
         return itertools.chain(*[self.as_dict().items()])
@@ -112,13 +451,30 @@ class UpdateContextManager(object):
         self.fields = fields
 
     def __enter__(self):
-        # Ensure thread local data is ready
-        self.log_context.data
-        self.log_context._stack.insert(0, {})
+        self.log_context._push()
         self.log_context.update(*self.objects, **self.fields)
+        if self.log_context.scope_listeners:
+            self.log_context.enter_scope()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.log_context.scope_listeners:
+                self.log_context.exit_scope()
+        finally:
+            self.log_context._pop()
+
+
+class IsolatedContextManager(object):
+    def __init__(self, log_context, token=None):
+        self.log_context = log_context
+        self.token = token
+
+    def __enter__(self):
+        self.saved = self.log_context.snapshot()
+        self.log_context.restore(self.token)
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.log_context._stack.pop(0)
+        self.log_context.restore(self.saved)
 
 
 class UpdateOneContextManager(object):
@@ -128,28 +484,144 @@ class UpdateOneContextManager(object):
         self.adapter_kw = adapter_kw
 
     def __enter__(self):
-        # Ensure thread local data is ready
-        self.log_context.data
-        self.log_context._stack.insert(0, {})
+        self.log_context._push()
         self.log_context.update_one(self.object_, **self.adapter_kw)
+        if self.log_context.scope_listeners:
+            self.log_context.enter_scope()
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.log_context._stack.pop(0)
+        try:
+            if self.log_context.scope_listeners:
+                self.log_context.exit_scope()
+        finally:
+            self.log_context._pop()
 
 
 context = Context()
 
 
+class _RecordDict(dict):
+    # __dict__ of a record with the context attached by reference. Context
+    # fields are looked up when missing from the record, so that %-style
+    # format strings find them.
+    __slots__ = ('fields', 'default')
+
+    def __missing__(self, key):
+        try:
+            return self.fields[key]
+        except KeyError:
+            return self.default[key]
+
+
+def _plain_record(class_, record_dict):
+    record = class_.__new__(class_)
+    record.__dict__.update(record_dict)
+    return record
+
+
+class _ContextRecord(object):
+    # Mixed in the class of records with the context attached by reference,
+    # to resolve context fields as attributes.
+    def __getattr__(self, name):
+        try:
+            return self.__dict__.__missing__(name)
+        except (AttributeError, KeyError):
+            raise AttributeError(name)
+
+    def __copy__(self):
+        # QueueHandler.prepare() copies records: keep the context attached.
+        record_dict = self.__dict__
+        record = _plain_record(self._record_class, record_dict)
+        _attach(record, record_dict.fields, record_dict.default)
+        return record
+
+    def __reduce__(self):
+        # Pickle a record of the original class, with the fields copied in.
+        record_dict = self.__dict__
+        fields = dict(record_dict.default)
+        fields.update(record_dict.fields)
+        fields.update(record_dict)
+        return _plain_record, (self._record_class, fields)
+
+
+_record_classes = {}
+
+
+def _attach(record, fields, default):
+    record_dict = record.__dict__
+    if not isinstance(record_dict, _RecordDict):
+        record_dict = _RecordDict(record_dict)
+        record.__dict__ = record_dict
+        class_ = record.__class__
+        try:
+            record.__class__ = _record_classes[class_]
+        except KeyError:
+            record.__class__ = _record_classes[class_] = type(
+                str(class_.__name__), (_ContextRecord, class_),
+                {'_record_class': class_})
+    record_dict.fields = fields
+    record_dict.default = default
+
+
+def annotate(records, default=None, zero_copy=False):
+    """
+    Add context fields to a batch of records, like AddContextFilter.
+
+    Records carrying a snapshot of the context as `pylogctx_snapshot` get the
+    fields of their snapshot, others the fields of the current context.
+    Consecutive records of the same context share the fields computed once
+    for them: without `zero_copy`, fields are copied from the context once,
+    then nested values are shared by these records.
+    """
+    default = default or {}
+    token = fields = object()
+    for record in records:
+        snapshot = getattr(record, 'pylogctx_snapshot', None)
+        if snapshot is not token:
+            token = snapshot
+            layer = context._layer() if snapshot is None else snapshot
+            merged = layer.merged()
+            if zero_copy:
+                fields = merged
+            else:
+                fields = dict(default, **layer.merged_copy())
+        if zero_copy:
+            _attach(record, fields, default)
+        else:
+            record.__dict__.update(fields)
+
+
 class AddContextFilter(logging.Filter):
-    def __init__(self, name='', default=None):
+    """
+    Add context fields to records.
+
+    By default, fields are copied in each record. With `zero_copy`, records
+    only reference the current snapshot of the context, and fields are
+    resolved as attributes and by %-style format strings. Attributes of the
+    record then take precedence over context fields. Copied records keep the
+    reference, pickled ones get the fields copied in. `{` and `$` style
+    format strings do not see the fields.
+    """
+    def __init__(self, name='', default=None, zero_copy=False):
         super(AddContextFilter, self).__init__(name)
         self.default = default or {}
+        self.zero_copy = zero_copy
 
     def filter(self, record):
+        if self.zero_copy:
+            _attach(record, context._merged(), self.default)
+            return True
         fields = dict(self.default, **context.as_dict())
         record.__dict__.update(fields)
         return True
 
+    def filter_batch(self, records):
+        """
+        Add context fields to records, sharing them between records of the
+        same context. See annotate().
+        """
+        annotate(records, self.default, self.zero_copy)
+
 
 class ExcInfoFilter(logging.Filter):
     def filter(self, record):
@@ -157,39 +629,189 @@ class ExcInfoFilter(logging.Filter):
         return True
 
 
+def _is_lazy(value):
+    # Whether value is or contains a LazyAccessor.
+    if isinstance(value, LazyAccessor):
+        return True
+    elif isinstance(value, (dict, FrozenDict)):
+        return any(_is_lazy(v) for v in value.values())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return any(_is_lazy(v) for v in value)
+    return False
+
+
 class AddContextFormatter(logging.Formatter):
+    def __init__(self, *args, **kwargs):
+        super(AddContextFormatter, self).__init__(*args, **kwargs)
+        self._cache = threading.local()
+
     def format(self, record):
         msg = super(AddContextFormatter, self).format(record)
-        context_str = ' '.join([
-            '{}:{}'.format(k, v) for k, v in context.items()
-        ])
-        return '{msg} {context}'.format(msg=msg, context=context_str)
+        return '{msg} {context}'.format(msg=msg, context=self._render())
+
+    def _render(self):
+        # The rendered context is cached per thread until the context changes.
+        # Fields holding a LazyAccessor are rendered again for each record, so
+        # that they show the current value.
+        cache = self._cache
+        version = context.version
+        if getattr(cache, 'version', None) != version:
+            parts = []
+            for k, v in context._merged().items():
+                parts.append((k, v) if _is_lazy(v) else '{}:{}'.format(k, v))
+            if not any(isinstance(part, tuple) for part in parts):
+                parts = ' '.join(parts)
+            cache.parts = parts
+            cache.version = version
+
+        parts = cache.parts
+        if isinstance(parts, list):
+            parts = ' '.join([
+                '{}:{}'.format(*part) if isinstance(part, tuple) else part
+                for part in parts
+            ])
+        return parts
 
 
 _adapter_mapping = {}
+# Adapter resolved for each type, as (registered class, adapter) or None when
+# the type has no adapter.
+_adapter_cache = {}
 
 
 class AdapterNotFound(Exception):
     pass
 
 
-def log_adapter(class_):
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class MemoizedAdapter(object):
+    """
+    Adapter remembering the fields returned for each object and kwargs.
+
+    Objects are referenced weakly: their fields are forgotten once they are
+    released, after `ttl` seconds if set, or when evicted as least recently
+    used beyond `maxsize` entries. Objects which can not be weakly referenced
+    and unhashable kwargs are not memoized.
+
+    Returned fields are shared: they must not be modified. Fields holding the
+    object, like a LazyAccessor on it, keep it alive until they are evicted.
+    """
+    def __init__(self, adapter, ttl=None, maxsize=1024):
+        self.adapter = adapter
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # (id of object, kwargs) to (weakref, expiry, fields), most recently
+        # used last.
+        self._entries = collections.OrderedDict()
+        self._released = collections.deque()
+        self._lock = threading.Lock()
+        functools.update_wrapper(self, adapter)
+
+    def __call__(self, object_, **kwargs):
+        try:
+            key = (id(object_), frozenset(kwargs.items()))
+        except TypeError:
+            return self._miss(object_, kwargs)
+
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(key)
+            if entry is not None:
+                ref, expiry, fields = entry
+                if ref() is object_ and (expiry is None or expiry > _clock()):
+                    self.hits += 1
+                    self._entries[key] = self._entries.pop(key)
+                    return fields
+                del self._entries[key]
+
+        fields = self._miss(object_, kwargs)
+        try:
+            ref = weakref.ref(object_, functools.partial(self._release, key))
+        except TypeError:
+            return fields
+        expiry = None if self.ttl is None else _clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (ref, expiry, fields)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return fields
+
+    def _miss(self, object_, kwargs):
+        with self._lock:
+            self.misses += 1
+        return self.adapter(object_, **kwargs)
+
+    def _release(self, key, ref):
+        # The object was released. Entries are purged later, since the
+        # garbage collector may call this while entries are being modified.
+        self._released.append((key, ref))
+
+    def _purge(self):
+        # Forget fields of released objects, unless their id is already
+        # reused. Called with lock.
+        while self._released:
+            key, ref = self._released.popleft()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del self._entries[key]
+
+    def invalidate(self, object_=None):
+        """
+        Forget fields of object_, or of all objects.
+        """
+        with self._lock:
+            self._purge()
+            if object_ is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == id(object_)]:
+                del self._entries[key]
+
+
+def log_adapter(class_, memoize=False, ttl=None, maxsize=1024):
+    """
+    Register the decorated callable as adapter of class_ instances.
+
+    With `memoize`, fields are remembered for each object and kwargs: the
+    decorator then returns a MemoizedAdapter, exposing `hits`, `misses` and
+    `invalidate()`.
+    """
     def decorator(callable_):
+        if memoize:
+            callable_ = MemoizedAdapter(callable_, ttl=ttl, maxsize=maxsize)
         _adapter_mapping[class_] = callable_
+        _adapter_cache.clear()
         return callable_
     return decorator
 
 
+def _resolve_adapter(type_):
+    for class_ in type_.__mro__:
+        adapter = _adapter_mapping.get(class_)
+        if adapter is not None:
+            return class_, adapter
+    return None
+
+
 def adapt(object_, **kwargs):
-    for class_ in object_.__class__.__mro__:
-        try:
-            adapter = _adapter_mapping[class_]
-            break
-        except KeyError:
-            continue
+    type_ = object_.__class__
+    try:
+        resolved = _adapter_cache[type_]
+    except KeyError:
+        resolved = _adapter_cache[type_] = _resolve_adapter(type_)
     else:
+        # Check the adapter was not unregistered behind our back.
+        if (resolved is not None and
+                _adapter_mapping.get(resolved[0]) is not resolved[1]):
+            resolved = _adapter_cache[type_] = _resolve_adapter(type_)
+
+    if resolved is None:
         raise AdapterNotFound("Can't log object of type %r" % type(object_))
-    return adapter(object_, **kwargs)
+    return resolved[1](object_, **kwargs)
 
 
 class LazyAccessor(object):
@@ -208,3 +830,44 @@ class LazyAccessor(object):
 
     def __repr__(self):
         return repr(self.get())
+
+
+class Deferred(LazyAccessor):
+    """
+    Value computed by calling func on first access, then memoized.
+
+    Records are formatted in other threads by queue listeners, buffering
+    handlers and executors: func is called once, whatever the thread.
+    """
+    _unset = object()
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.value = self._unset
+        self._lock = threading.Lock()
+
+    def get(self):
+        value = self.value
+        if value is self._unset:
+            with self._lock:
+                value = self.value
+                if value is self._unset:
+                    value = self.value = self.func(*self.args, **self.kwargs)
+                    # Release what the computation needed.
+                    self.func = self.args = self.kwargs = None
+        return value
+
+    def __deepcopy__(self, memo):
+        # Shared like lazy values of the context, so that it is computed once.
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,96 @@
+"""
+Delta encoding of the context appended to log lines.
+
+DeltaContextFormatter appends the whole context only when it changes, or once
+every `every` records. Other lines carry a reference to the last full context.
+Full lines end with `@<ref>= <context>`, other lines with `@<ref>`. References
+are `<pid>-<version>`, so that processes sharing a stream, like forked
+workers, do not reference each other's contexts.
+
+decode() turns such lines back into the lines AddContextFormatter would have
+written. Run ``python -m pylogctx.delta < app.log`` to decode a log file.
+"""
+from __future__ import absolute_import, print_function
+
+import logging
+import os
+import re
+import sys
+import threading
+
+from .core import AddContextFormatter, context
+
+
+class DeltaContextFormatter(AddContextFormatter):
+    """
+    Formatter appending the context only when it changes.
+
+    State is kept per thread: use one formatter per handler, so that each
+    output stream holds the full contexts it references. References are
+    the process id and the context version.
+    """
+    def __init__(self, *args, **kwargs):
+        # Number of records between two full contexts, so that a reader
+        # starting in the middle of a stream resyncs.
+        self.every = kwargs.pop('every', 100)
+        super(DeltaContextFormatter, self).__init__(*args, **kwargs)
+        self._emitted = threading.local()
+
+    def format(self, record):
+        msg = logging.Formatter.format(self, record)
+        # Versions count per process, and forked children go on counting
+        # from the version of their parent.
+        ref = '%d-%d' % (os.getpid(), context.version)
+        emitted = self._emitted
+        count = getattr(emitted, 'count', 0)
+        if getattr(emitted, 'ref', None) == ref and 0 < count < self.every:
+            emitted.count = count + 1
+            return '{msg} @{ref}'.format(msg=msg, ref=ref)
+
+        rendered = self._render()
+        # Lazy fields change without changing the version: always send them.
+        emitted.count = 0 if isinstance(self._cache.parts, list) else 1
+        emitted.ref = ref
+        return '{msg} @{ref}= {context}'.format(
+            msg=msg, ref=ref, context=rendered)
+
+
+# The message may contain references too: match the last one.
+_reference = re.compile(r'^(.*) @(\d+-\d+)(=(?: (.*?))?)?$')
+
+
+def decode(lines):
+    """
+    Yield lines with the full context, as written by AddContextFormatter.
+
+    Lines referencing a context not seen yet are yielded unchanged.
+    """
+    contexts = {}
+    for line in lines:
+        newline = '\n' if line.endswith('\n') else ''
+        line = line.rstrip('\n')
+        match = _reference.match(line)
+        if match is None:
+            yield line + newline
+            continue
+
+        msg, ref, full, rendered = match.groups()
+        if full:
+            rendered = rendered or ''
+            contexts[ref] = rendered
+        else:
+            rendered = contexts.get(ref)
+            if rendered is None:
+                yield line + newline
+                continue
+        yield '{msg} {context}{newline}'.format(
+            msg=msg, context=rendered, newline=newline)
+
+
+def main():
+    for line in decode(sys.stdin):
+        sys.stdout.write(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,8 +15,10 @@ class OuterMiddleware(MiddlewareMixin):
             context.update(request)
         except AdapterNotFound:
             logger.info("Can't adapt %s for log.", request.__class__.__name__)
+        context.enter_scope()
 
     def process_response(self, request, response):
+        context.exit_scope()
         context.clear()
         return response
 
@@ -33,3 +35,4 @@ class ExtractRequestContextMiddleware(OuterMiddleware):
             context.update(**extractor(request))
         except Exception:
             logger.exception()
+        context.enter_scope()
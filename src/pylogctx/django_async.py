@@ -0,0 +1,91 @@
+"""
+Django middlewares running natively in both WSGI and ASGI deployments.
+
+Under ASGI, concurrent requests share the event loop thread: store the
+context in a context variable to isolate requests. See
+``pylogctx.storage.ContextVarStorage``.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from pylogctx import context, AdapterNotFound
+from pylogctx.storage import ContextVarStorage
+
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    iscoroutinefunction = asyncio.iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+
+logger = logging.getLogger(__name__)
+
+
+class OuterMiddleware(object):
+    """
+    Run each request in a clean context, restoring the previous one after.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            if not isinstance(context.storage, ContextVarStorage):
+                raise ImproperlyConfigured(
+                    "Concurrent requests share thread local log context. "
+                    "Use pylogctx.storage.ContextVarStorage.")
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        saved_context = context.snapshot()
+        context.restore()
+        try:
+            self.process_request(request)
+            context.enter_scope()
+            try:
+                return self.get_response(request)
+            finally:
+                context.exit_scope()
+        finally:
+            context.restore(saved_context)
+
+    async def __acall__(self, request):
+        saved_context = context.snapshot()
+        context.restore()
+        try:
+            self.process_request(request)
+            context.enter_scope()
+            try:
+                return await self.get_response(request)
+            finally:
+                context.exit_scope()
+        finally:
+            context.restore(saved_context)
+
+    def process_request(self, request):
+        try:
+            context.update(request)
+        except AdapterNotFound:
+            logger.info("Can't adapt %s for log.", request.__class__.__name__)
+
+
+class ExtractRequestContextMiddleware(OuterMiddleware):
+    def process_request(self, request):
+        extractor = settings.PYLOGCTX_REQUEST_EXTRACTOR
+        try:
+            context.update(**extractor(request))
+        except Exception:
+            logger.exception("Failed to extract log context from request.")
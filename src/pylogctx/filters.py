@@ -0,0 +1,323 @@
+"""
+Logging filters driven by the context.
+"""
+from __future__ import absolute_import
+
+import collections
+import logging
+import random
+import threading
+import time
+import weakref
+
+from .compat import Mapping, string_types
+from .core import context
+from .helpers import FrozenDict
+
+
+_missing = object()
+
+
+def _check_level(level):
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level)
+    if not isinstance(value, int):
+        raise ValueError('Unknown level: %r' % (level,))
+    return value
+
+
+class LevelOverrideFilter(logging.Filter):
+    """
+    Drop records below `level`, unless the context matches an override rule.
+
+    `rules` is a sequence of `(fields, level)` pairs: records logged in a
+    context holding all of `fields` pass from `level`. When several rules
+    match, the lowest level wins.
+
+    Usage:
+    .. code-block:: python
+
+        handler.addFilter(LevelOverrideFilter(logging.INFO, [
+            ({'userId': 42}, logging.DEBUG),
+        ]))
+
+    Loggers must let records of the override levels through. The level of the
+    context is cached until the context or the rules change.
+    """
+    def __init__(self, level=logging.NOTSET, rules=(), name=''):
+        super(LevelOverrideFilter, self).__init__(name)
+        self.level = _check_level(level)
+        self.set_rules(rules)
+
+    def set_rules(self, rules):
+        self.rules = [(dict(fields), _check_level(level))
+                      for fields, level in rules]
+        # Drop the level cached by each thread.
+        self._cache = threading.local()
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        cache = self._cache
+        version = context.version
+        if getattr(cache, 'version', None) != version:
+            cache.level = self._context_level()
+            cache.version = version
+        return record.levelno >= cache.level
+
+    def _context_level(self):
+        level = self.level
+        # The merge is cached, and shared with AddContextFilter.
+        merged = context._merged()
+        for fields, override in self.rules:
+            if override >= level:
+                continue
+            for key, value in fields.items():
+                if merged.get(key, _missing) != value:
+                    break
+            else:
+                level = override
+        return level
+
+
+def _getter(path):
+    # Return a function reading path, a dotted string or a sequence of keys,
+    # from the context.
+    if isinstance(path, string_types):
+        path = path.split('.')
+    first, rest = path[0], tuple(path[1:])
+
+    def get():
+        value = context.get(first, _missing)
+        for key in rest:
+            if not isinstance(value, (dict, FrozenDict)):
+                return _missing
+            value = value.get(key, _missing)
+        return value
+    return get
+
+
+class ProjectionFilter(logging.Filter):
+    """
+    Add only the given context fields to records.
+
+    `keys` is a sequence of paths, or a mapping of record attributes to
+    paths. A path is a key of the context, or a path to a value nested in
+    dicts, dotted or as a tuple: `user.id` or `('user', 'id')`. Fields
+    missing from the context take their value in `defaults`, or are not set.
+
+    Fields are read from the context without merging its whole stack, and
+    cached per thread until the context changes.
+    """
+    def __init__(self, keys, defaults=None, name=''):
+        super(ProjectionFilter, self).__init__(name)
+        if isinstance(keys, Mapping):
+            keys = keys.items()
+        else:
+            keys = [
+                (key if isinstance(key, string_types) else '.'.join(key), key)
+                for key in keys
+            ]
+        self.getters = [(name, _getter(path)) for name, path in keys]
+        self.defaults = defaults or {}
+        self._cache = threading.local()
+
+    def filter(self, record):
+        cache = self._cache
+        version = context.version
+        if getattr(cache, 'version', None) != version:
+            cache.fields = self._project()
+            cache.version = version
+        record.__dict__.update(cache.fields)
+        return True
+
+    def _project(self):
+        fields = {}
+        for name, get in self.getters:
+            value = get()
+            if value is _missing:
+                value = self.defaults.get(name, _missing)
+                if value is _missing:
+                    continue
+            fields[name] = value
+        # Values are copied, like AddContextFilter does, so that changing
+        # them in records leaves the context untouched.
+        return context._layer()._copy_items(fields)
+
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def _move_to_end(ordered_dict, key):
+    try:
+        ordered_dict.move_to_end(key)
+    except AttributeError:  # Python 2
+        ordered_dict[key] = ordered_dict.pop(key)
+
+
+class _Bucket(object):
+    # Rate limit state of a key.
+    __slots__ = ('tokens', 'updated', 'suppressed')
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+        self.suppressed = 0
+
+
+class _Scope(object):
+    # Keys limited in the outermost scope of a thread or task.
+    __slots__ = ('depth', 'keys')
+
+    def __init__(self):
+        self.depth = 1
+        self.keys = set()
+
+
+class _WeakScopeListener(object):
+    # Forward scopes to a listener without keeping it alive: logging never
+    # closes filters, so a configuration dropping a filter would leak it.
+    __slots__ = ('listener', '__weakref__')
+
+    def __init__(self, listener):
+        self.listener = weakref.ref(listener, self._release)
+
+    def _release(self, ref):
+        context.remove_scope_listener(self)
+
+    def enter_scope(self):
+        listener = self.listener()
+        if listener is not None:
+            listener.enter_scope()
+
+    def exit_scope(self):
+        listener = self.listener()
+        if listener is not None:
+            listener.exit_scope()
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limit records per value of the context fields `keys`.
+
+    With `rate`, records of each key pass at `rate` per second on average, in
+    bursts of up to `burst` records. With `sample`, a record passes with
+    probability `sample`. Set either or both.
+
+    State is kept for the `max_keys` most recently used keys. When the
+    outermost scope ends, a summary record counting the records suppressed in
+    the scope is logged with the `summary_logger` logger. Summaries pass
+    through the filter. See Context.add_scope_listener() for scopes.
+
+    Unhashable values of `keys` are limited by their repr().
+    """
+    def __init__(self, keys=('rid',), rate=None, burst=None, sample=None,
+                 max_keys=10000, summary_logger='pylogctx.ratelimit',
+                 storage=None, name=''):
+        super(RateLimitFilter, self).__init__(name)
+        self.keys = tuple(keys)
+        self.rate = rate
+        self.burst = burst or max(rate or 1, 1)
+        self.sample = sample
+        self.max_keys = max_keys
+        self.summary_logger = logging.getLogger(summary_logger)
+        self._buckets = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._cache = threading.local()
+        # Scopes follow the threads or tasks of the context.
+        self.storage = storage or context.storage.__class__()
+        self._listener = _WeakScopeListener(self)
+        context.add_scope_listener(self._listener)
+
+    def close(self):
+        context.remove_scope_listener(self._listener)
+
+    def _key(self):
+        # The key is cached until the context changes.
+        cache = self._cache
+        version = context.version
+        if getattr(cache, 'version', None) != version:
+            merged = context._merged()
+            cache.key = tuple(
+                _hashable(merged.get(key)) for key in self.keys)
+            cache.version = version
+        return cache.key
+
+    def filter(self, record):
+        if getattr(record, 'pylogctx_summary', False):
+            return True
+
+        key = self._key()
+        scope = self.storage.get()
+        if scope is not None:
+            scope.keys.add(key)
+
+        if self.sample is not None and random.random() >= self.sample:
+            allowed = False
+        else:
+            allowed = True
+        with self._lock:
+            bucket = self._bucket(key)
+            if allowed and self.rate is not None:
+                now = _clock()
+                bucket.tokens = min(
+                    self.burst,
+                    bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+                if bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                else:
+                    allowed = False
+            if not allowed:
+                bucket.suppressed += 1
+        return allowed
+
+    def _bucket(self, key):
+        # Get the bucket of key, most recently used last. Called with lock.
+        buckets = self._buckets
+        try:
+            bucket = buckets[key]
+        except KeyError:
+            while len(buckets) >= self.max_keys:
+                buckets.popitem(last=False)
+            bucket = buckets[key] = _Bucket(self.burst, _clock())
+        else:
+            _move_to_end(buckets, key)
+        return bucket
+
+    def enter_scope(self):
+        scope = self.storage.get()
+        if scope is None:
+            self.storage.set(_Scope())
+        else:
+            scope.depth += 1
+
+    def exit_scope(self):
+        scope = self.storage.get()
+        if scope is None:
+            # Listening started within the scope.
+            return
+        scope.depth -= 1
+        if scope.depth:
+            return
+        self.storage.set(None)
+
+        for key in scope.keys:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None or not bucket.suppressed:
+                    continue
+                suppressed, bucket.suppressed = bucket.suppressed, 0
+            self.summary_logger.warning(
+                '%d records suppressed for %s', suppressed,
+                ' '.join('%s:%s' % item for item in zip(self.keys, key)),
+                extra={'pylogctx_summary': True, 'suppressed': suppressed})
@@ -0,0 +1,95 @@
+"""
+concurrent.futures executors running callables in the context of the caller.
+"""
+from __future__ import absolute_import
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pickle
+import threading
+
+from .core import _is_lazy, context, LazyAccessor
+from .helpers import FrozenDict, FrozenList
+
+
+# Last pickled context of each submitting thread.
+_sent = threading.local()
+# Last context received by a worker process.
+_received = {}
+
+
+def _call_in_context(token, fn, *args, **kwargs):
+    saved_context = context.snapshot()
+    context.restore(token)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        context.restore(saved_context)
+
+
+def _call_with_fields(payload, fn, *args, **kwargs):
+    saved_context = context.snapshot()
+    if _received.get('payload') == payload:
+        context.restore(_received['token'])
+    else:
+        context.restore()
+        context.update(**pickle.loads(payload))
+        _received.update(payload=payload, token=context.snapshot())
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        context.restore(saved_context)
+
+
+def _picklable(value):
+    # Evaluate lazy values, which reference objects of the caller process.
+    if isinstance(value, LazyAccessor):
+        return value.get()
+    elif isinstance(value, (dict, FrozenDict)):
+        return dict((k, _picklable(v)) for k, v in value.items())
+    elif isinstance(value, (list, FrozenList)):
+        # Frozen lists stand for lists: workers may not freeze values.
+        return [_picklable(v) for v in value]
+    elif type(value) is tuple:
+        # Tuples override values of lower layers where lists extend them:
+        # keep the type.
+        return tuple(_picklable(v) for v in value)
+    return value
+
+
+def _payload():
+    # Context fields pickled once per context state, unless lazy fields need
+    # to be evaluated again.
+    version = context.version
+    if getattr(_sent, 'version', None) == version:
+        return _sent.payload
+
+    fields = context._merged()
+    payload = pickle.dumps(_picklable(fields), pickle.HIGHEST_PROTOCOL)
+    if not _is_lazy(fields):
+        _sent.version = version
+        _sent.payload = payload
+    return payload
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Thread pool running callables in the context they were submitted from.
+
+    Workers get a snapshot of the context, not a copy: submitting does not
+    depend on the size of the context.
+    """
+    def submit(self, fn, *args, **kwargs):
+        return super(ContextThreadPoolExecutor, self).submit(
+            _call_in_context, context.snapshot(), fn, *args, **kwargs)
+
+
+class ContextProcessPoolExecutor(ProcessPoolExecutor):
+    """
+    Process pool running callables in the context they were submitted from.
+
+    Context fields are pickled once per context state and sent to workers,
+    with lazy fields evaluated. Values must be picklable.
+    """
+    def submit(self, fn, *args, **kwargs):
+        return super(ContextProcessPoolExecutor, self).submit(
+            _call_with_fields, _payload(), fn, *args, **kwargs)
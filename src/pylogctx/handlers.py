@@ -0,0 +1,182 @@
+"""
+Logging handlers aware of the context.
+"""
+from __future__ import absolute_import
+
+import collections
+import logging
+from logging.handlers import MemoryHandler
+
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:  # Python 2
+    QueueHandler = QueueListener = None
+
+from .core import annotate, context
+
+
+if QueueHandler is not None:
+    # Queue handlers require Python 3.2 or later.
+    class ContextQueueHandler(QueueHandler):
+        """
+        Queue handler capturing the context of records.
+
+        Records carry a snapshot of the context as `pylogctx_snapshot`. The
+        snapshot is not a copy: it does not depend on the size of the context.
+        The queue must not pickle records.
+        """
+        def prepare(self, record):
+            record.pylogctx_snapshot = context.snapshot()
+            return super(ContextQueueHandler, self).prepare(record)
+
+    class ContextQueueListener(QueueListener):
+        """
+        Queue listener handling each record in the context it was logged in.
+
+        Filters and formatters of the handlers, like AddContextFilter and
+        AddContextFormatter, see the context captured by ContextQueueHandler.
+        """
+        def handle(self, record):
+            snapshot = getattr(record, 'pylogctx_snapshot', None)
+            if snapshot is None:
+                return super(ContextQueueListener, self).handle(record)
+
+            saved_context = context.snapshot()
+            context.restore(snapshot)
+            try:
+                super(ContextQueueListener, self).handle(record)
+            finally:
+                context.restore(saved_context)
+
+
+class ContextMemoryHandler(MemoryHandler):
+    """
+    Memory handler adding context fields to records when flushing them.
+
+    Records carry a snapshot of the context as `pylogctx_snapshot`, captured
+    without copying it. On flush, fields are added in batch, like
+    AddContextFilter with `default` and `zero_copy` would, merging them once
+    per context. Handlers of the target thus read context fields as record
+    attributes.
+    """
+    def __init__(self, *args, **kwargs):
+        self.default = kwargs.pop('default', None)
+        self.zero_copy = kwargs.pop('zero_copy', False)
+        super(ContextMemoryHandler, self).__init__(*args, **kwargs)
+
+    def emit(self, record):
+        record.pylogctx_snapshot = context.snapshot()
+        super(ContextMemoryHandler, self).emit(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.target:
+                annotate(self.buffer, self.default, self.zero_copy)
+                for record in self.buffer:
+                    self.target.handle(record)
+                self.buffer = []
+        finally:
+            self.release()
+
+
+class _Buffer(object):
+    # Records buffered in a scope.
+    __slots__ = ('records', 'size', 'depth', 'triggered')
+
+    def __init__(self):
+        self.records = collections.deque()
+        self.size = 0
+        self.depth = 1
+        self.triggered = False
+
+
+class FingersCrossedHandler(logging.Handler):
+    """
+    Handler buffering records of each scope, passed to `target` only if a
+    record of `trigger_level` or above is logged in the scope.
+
+    Scopes are context blocks, requests and tasks: see
+    Context.add_scope_listener(). Nested scopes share the buffer of the
+    outermost one, which is released when it ends. Once triggered, records
+    of the scope go straight to `target`. Records logged outside of any scope
+    are not buffered.
+
+    A buffer holds at most `capacity` records and `max_bytes` of messages,
+    dropping the oldest records first. Records keep a snapshot of their
+    context, so that filters and formatters of `target` see the context they
+    were logged in.
+    """
+    def __init__(self, target, trigger_level=logging.ERROR, capacity=1000,
+                 max_bytes=None, storage=None):
+        super(FingersCrossedHandler, self).__init__()
+        self.target = target
+        self.trigger_level = trigger_level
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        # Buffers follow the threads or tasks of the context.
+        self.storage = storage or context.storage.__class__()
+        context.add_scope_listener(self)
+
+    def enter_scope(self):
+        buffer_ = self.storage.get()
+        if buffer_ is None:
+            self.storage.set(_Buffer())
+        else:
+            buffer_.depth += 1
+
+    def exit_scope(self):
+        buffer_ = self.storage.get()
+        if buffer_ is None:
+            # Listening started within the scope.
+            return
+        buffer_.depth -= 1
+        if not buffer_.depth:
+            self.storage.set(None)
+
+    def emit(self, record):
+        try:
+            buffer_ = self.storage.get()
+            if buffer_ is None or buffer_.triggered:
+                self.target.handle(record)
+            elif record.levelno >= self.trigger_level:
+                buffer_.triggered = True
+                records = buffer_.records
+                buffer_.records = None
+                for buffered, snapshot, _ in records:
+                    self._handle_buffered(buffered, snapshot)
+                self.target.handle(record)
+            else:
+                self._buffer(buffer_, record)
+        except Exception:
+            self.handleError(record)
+
+    def _buffer(self, buffer_, record):
+        # Records are shared with other handlers: keep their snapshot and size
+        # aside rather than modifying them.
+        size = 0
+        if self.max_bytes is not None:
+            size = len(record.getMessage())
+        records = buffer_.records
+        records.append((record, context.snapshot(), size))
+        buffer_.size += size
+        while records and (
+                len(records) > self.capacity or
+                (self.max_bytes is not None and
+                 buffer_.size > self.max_bytes)):
+            buffer_.size -= records.popleft()[2]
+
+    def _handle_buffered(self, record, snapshot):
+        saved_context = context.snapshot()
+        context.restore(snapshot)
+        try:
+            self.target.handle(record)
+        finally:
+            context.restore(saved_context)
+
+    def flush(self):
+        self.target.flush()
+
+    def close(self):
+        context.remove_scope_listener(self)
+        super(FingersCrossedHandler, self).close()
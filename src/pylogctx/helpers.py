@@ -1,12 +1,18 @@
+import collections
 import copy
+import itertools
+import threading
 
+from .compat import Mapping, string_types
 
-def deepupdate(target, src):
+
+def deepupdate(target, src, limits=None):
     """Deep update target dict with src
     For each k,v in src: if k doesn't exist in target, it is deep copied from
     src to target. Otherwise, if v is a list, target[k] is extended with
     src[k]. If v is a set, target[k] is updated with v, If v is a dict,
-    recursively deep-update it.
+    recursively deep-update it. If limits are given, target is kept within
+    them.
 
     Examples:
     >>> t = {'name': 'toto', 'hobbies': ['programming', 'chess']}
@@ -22,10 +28,12 @@ def deepupdate(target, src):
                 if isinstance(v, list):
                     target[k].extend(v)
                 elif isinstance(v, dict):
-                    deepupdate(target[k], v)
+                    deepupdate(target[k], v, limits)
                 elif isinstance(v, set):
                     target[k].update(v)
             else:
+                if limits and not limits.accept(target, k):
+                    continue
                 if isinstance(v, LazyAccessor):
                     # To have a lazy representation from the instance we need
                     # to keep the reference
@@ -33,6 +41,238 @@ def deepupdate(target, src):
                 elif isinstance(v, dict):
                     # For manage nested LazyAccessor object
                     target[k] = {}
-                    deepupdate(target[k], v)
+                    deepupdate(target[k], v, limits)
                 else:
                     target[k] = copy.deepcopy(v)
+            if limits:
+                limits.bound(target, k)
+
+
+def copycontainers(src):
+    """Copy the dicts, lists and sets of src dict, recursively
+
+    Other values, like strings, numbers and tuples, are shared: copying them
+    would not protect anything deepupdate or the copy's owner changes in
+    place. The copy thus costs a dict copy, plus the copy of the containers.
+
+    Examples:
+    >>> t = {'name': 'toto', 'hobbies': ['programming']}
+    >>> c = copycontainers(t)
+    >>> c['hobbies'].append('chess')
+    >>> print t
+    {'name': 'toto', 'hobbies': ['programming']}
+    """
+    copied = dict(src)
+    for k, v in src.items():
+        if isinstance(v, _CONTAINERS):
+            copied[k] = _copy_container(v)
+    return copied
+
+
+_CONTAINERS = (dict, list, set)
+
+
+def _copy_container(value):
+    if isinstance(value, dict):
+        return copycontainers(value)
+    elif type(value) is list:
+        return [
+            _copy_container(v) if isinstance(v, _CONTAINERS) else v
+            for v in value
+        ]
+    elif isinstance(value, list):
+        copied = copy.copy(value)
+        for i, v in enumerate(value):
+            if isinstance(v, _CONTAINERS):
+                copied[i] = _copy_container(v)
+        return copied
+    # Items of sets are hashable: they are not containers.
+    return copy.copy(value)
+
+
+class Limits(object):
+    """Bounds on the records of a context
+
+    Limits apply to each level of the context stack, when records are pushed.
+
+    `max_keys`: maximum number of keys of a dict. Other keys are dropped.
+
+    `max_items`: maximum length of lists and sets. Lists keep their last
+    items, as a ring buffer. Sets drop arbitrary items.
+
+    `max_value_size`: maximum length of strings. Longer strings are
+    truncated.
+
+    `triggered` counts how many times each limit was hit.
+    """
+    def __init__(self, max_keys=None, max_items=None, max_value_size=None):
+        self.max_keys = max_keys
+        self.max_items = max_items
+        self.max_value_size = max_value_size
+        self.triggered = collections.Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, limit):
+        with self._lock:
+            self.triggered[limit] += 1
+
+    def accept(self, target, key):
+        """Whether key can be added to target dict."""
+        if (self.max_keys is None or key in target or
+                len(target) < self.max_keys):
+            return True
+        self.hit('max_keys')
+        return False
+
+    def bound(self, target, key):
+        """Bound the value of key in target dict."""
+        value = target[key]
+        if (self.max_items is not None and
+                isinstance(value, (list, set, FrozenList, FrozenSet)) and
+                len(value) > self.max_items):
+            self.hit('max_items')
+            if isinstance(value, list):
+                del value[:len(value) - self.max_items]
+            elif isinstance(value, set):
+                while len(value) > self.max_items:
+                    value.pop()
+            elif isinstance(value, FrozenList):
+                target[key] = FrozenList(value[len(value) - self.max_items:])
+            else:
+                target[key] = FrozenSet(
+                    itertools.islice(value, self.max_items))
+        elif (self.max_value_size is not None and
+                isinstance(value, string_types) and
+                len(value) > self.max_value_size):
+            self.hit('max_value_size')
+            target[key] = value[:self.max_value_size]
+
+
+class FrozenList(tuple):
+    """Immutable list, as stored by frozenupdate."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __eq__(self, other):
+        if isinstance(other, list):
+            return list(self) == other
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = tuple.__hash__
+
+
+class FrozenSet(frozenset):
+    """Immutable set, as stored by frozenupdate."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return repr(set(self))
+
+
+class FrozenDict(Mapping):
+    """Immutable dict, as stored by frozenupdate."""
+    __slots__ = ('_data',)
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        return self._data.keys()
+
+    def items(self):
+        return self._data.items()
+
+    def values(self):
+        return self._data.values()
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def copy(self):
+        """Return a mutable copy."""
+        return dict(self._data)
+
+
+_FROZEN = (FrozenList, FrozenSet, FrozenDict)
+
+
+def freeze(value):
+    """Return an immutable version of value
+
+    dicts, lists and sets are converted to FrozenDict, FrozenList and
+    FrozenSet, recursively, as well as the items of tuples. Other values are
+    returned as is.
+    """
+    # Frozen values are returned as is: none is a dict, a list, a set or a
+    # plain tuple.
+    if isinstance(value, dict):
+        frozen = FrozenDict.__new__(FrozenDict)
+        frozen._data = {k: freeze(v) for k, v in value.items()}
+        return frozen
+    elif isinstance(value, list):
+        return FrozenList([freeze(v) for v in value])
+    elif isinstance(value, set):
+        return FrozenSet(value)
+    elif type(value) is tuple:
+        items = tuple([freeze(v) for v in value])
+        for a, b in zip(items, value):
+            if a is not b:
+                return items
+        return value
+    return value
+
+
+def frozenupdate(target, src, limits=None):
+    """Update target dict with frozen values from src
+
+    Same rules as deepupdate, except that values are frozen when stored and
+    never modified afterwards: merging a list, a set or a dict in an existing
+    value stores a new frozen value. Frozen values can thus be shared instead
+    of copied. If limits are given, target is kept within them.
+
+    Examples:
+    >>> t = {'hobbies': FrozenList(['programming', 'chess'])}
+    >>> frozenupdate(t, {'hobbies': ['gaming']})
+    >>> print t
+    {'hobbies': ['programming', 'chess', 'gaming']}
+    """
+    if src and isinstance(src, (dict, FrozenDict)):
+        for k, v in src.items():
+            v = freeze(v)
+            current = target.get(k)
+            if current is not None and isinstance(v, _FROZEN):
+                if isinstance(v, FrozenList):
+                    v = FrozenList(current + v)
+                elif isinstance(v, FrozenDict):
+                    items = dict(current)
+                    frozenupdate(items, v, limits)
+                    v = FrozenDict(items)
+                else:
+                    v = FrozenSet(current | v)
+            elif limits:
+                if not limits.accept(target, k):
+                    continue
+                if isinstance(v, FrozenDict):
+                    items = {}
+                    frozenupdate(items, v, limits)
+                    v = FrozenDict(items)
+            target[k] = v
+            if limits:
+                limits.bound(target, k)
@@ -0,0 +1,155 @@
+"""
+JSON lines formatter including the context.
+"""
+from __future__ import absolute_import
+
+import datetime
+import json
+import logging
+import threading
+
+from .compat import string_types
+from .core import LazyAccessor, _is_lazy, context
+from .helpers import FrozenDict, FrozenSet
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+# Serializers of values JSON can not encode, by type.
+default_serializers = {
+    LazyAccessor: lambda value: value.get(),
+    FrozenDict: dict,
+    FrozenSet: list,
+    set: list,
+    frozenset: list,
+    datetime.date: _isoformat,
+    datetime.time: _isoformat,
+}
+
+
+def json_default(value):
+    """
+    Return a value JSON encodes in place of value, with the serializer of its
+    type in `default_serializers`, or its str().
+
+    Pass it as `default` to json.dumps().
+    """
+    for class_ in value.__class__.__mro__:
+        serializer = default_serializers.get(class_)
+        if serializer is not None:
+            return serializer(value)
+    return str(value)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as JSON objects, with the fields of the context.
+
+    `fields` lists the record attributes to output, as names or `(key,
+    attribute)` pairs. `message` is the formatted message and `asctime` the
+    time formatted with `datefmt`. Context fields named like these are left
+    out.
+
+    The context is encoded once per thread until it changes, except for
+    fields holding a LazyAccessor: these are encoded for each record.
+
+    `serializers` maps types to functions returning a value JSON encodes,
+    completing `default_serializers`. Values of other types are encoded as
+    their str().
+    """
+    default_fields = (
+        ('time', 'asctime'),
+        ('level', 'levelname'),
+        ('logger', 'name'),
+        ('message', 'message'),
+    )
+
+    def __init__(self, fields=None, datefmt=None, serializers=None):
+        super(JSONFormatter, self).__init__(datefmt=datefmt)
+        self.fields = [
+            (field, field) if isinstance(field, string_types) else tuple(field)
+            for field in (fields or self.default_fields)
+        ]
+        self.serializers = default_serializers.copy()
+        self.serializers.update(serializers or {})
+        # Serializer resolved for each type, None for str().
+        self._resolved = {}
+        self._encoder = json.JSONEncoder(
+            separators=(',', ':'), default=self._default)
+        self._keys = [
+            (self._encoder.encode(key), attribute)
+            for key, attribute in self.fields
+        ]
+        self._reserved = set(key for key, _ in self.fields)
+        self._reserved.update(('exc_info', 'stack_info'))
+        self._cache = threading.local()
+
+    def _default(self, value):
+        type_ = value.__class__
+        try:
+            serializer = self._resolved[type_]
+        except KeyError:
+            serializer = None
+            for class_ in type_.__mro__:
+                serializer = self.serializers.get(class_)
+                if serializer is not None:
+                    break
+            self._resolved[type_] = serializer
+        if serializer is None:
+            return str(value)
+        return serializer(value)
+
+    def format(self, record):
+        record.message = record.getMessage()
+        encode = self._encoder.encode
+        parts = []
+        for key, attribute in self._keys:
+            if attribute == 'asctime':
+                value = record.asctime = self.formatTime(record, self.datefmt)
+            else:
+                value = getattr(record, attribute, None)
+            parts.append(key + ':' + encode(value))
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            parts.append('"exc_info":' + encode(record.exc_text))
+        stack_info = getattr(record, 'stack_info', None)
+        if stack_info:
+            stack_info = self.formatStack(stack_info)
+            parts.append('"stack_info":' + encode(stack_info))
+
+        fragment = self._fragment()
+        if fragment:
+            parts.append(fragment)
+        return '{' + ','.join(parts) + '}'
+
+    def _fragment(self):
+        # Encoded fields of the context, cached per thread until the context
+        # changes.
+        cache = self._cache
+        version = context.version
+        if getattr(cache, 'version', None) != version:
+            encode = self._encoder.encode
+            encoded = []
+            lazy = []
+            for k, v in context._merged().items():
+                if k in self._reserved:
+                    continue
+                if _is_lazy(v):
+                    lazy.append((encode(str(k)), v))
+                else:
+                    encoded.append(encode(str(k)) + ':' + encode(v))
+            cache.fragment = ','.join(encoded)
+            cache.lazy = lazy
+            cache.version = version
+
+        if not cache.lazy:
+            return cache.fragment
+        encode = self._encoder.encode
+        parts = [key + ':' + encode(value) for key, value in cache.lazy]
+        if cache.fragment:
+            parts.insert(0, cache.fragment)
+        return ','.join(parts)
@@ -0,0 +1,105 @@
+"""
+Where the context stack of each thread or task is stored.
+
+A storage holds the top layer of a context stack. ``shared`` tells whether
+the stored layer may be shared with other workers, in which case the context
+never modifies it in place. ``get()`` returns the stored layer, or None, and
+``set(layer)`` stores a layer, or None to drop it.
+
+Storages are registered by name in ``storages``, for get_storage().
+"""
+import threading
+import weakref
+
+from .compat import string_types
+
+try:
+    import contextvars
+except ImportError:  # Python < 3.7
+    contextvars = None
+
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+
+class ThreadLocalStorage(threading.local):
+    """
+    Store one context stack per thread.
+    """
+    shared = False
+    layer = None
+
+    def get(self):
+        return self.layer
+
+    def set(self, layer):
+        self.layer = layer
+
+
+class ContextVarStorage(object):
+    """
+    Store the context stack in a context variable.
+
+    Each asyncio task runs in a copy of the context variables of its creator,
+    so concurrent tasks of an event loop have their own context. Copying is
+    cheap since the stack is never modified in place.
+    """
+    shared = True
+
+    def __init__(self, name='pylogctx'):
+        if contextvars is None:
+            raise RuntimeError('contextvars requires Python 3.7 or later')
+        self._var = contextvars.ContextVar(name, default=None)
+
+    def get(self):
+        return self._var.get()
+
+    def set(self, layer):
+        self._var.set(layer)
+
+
+class GreenletStorage(object):
+    """
+    Store one context stack per greenlet.
+
+    Greenlets, like those of gevent, switching in a thread then have their own
+    context, without monkey patching threading.local. A greenlet starts with
+    an empty context.
+    """
+    shared = False
+
+    def __init__(self):
+        if greenlet is None:
+            raise RuntimeError('GreenletStorage requires greenlet')
+        self._layers = weakref.WeakKeyDictionary()
+
+    def get(self):
+        return self._layers.get(greenlet.getcurrent())
+
+    def set(self, layer):
+        if layer is None:
+            self._layers.pop(greenlet.getcurrent(), None)
+        else:
+            self._layers[greenlet.getcurrent()] = layer
+
+
+storages = {
+    'thread': ThreadLocalStorage,
+    'contextvars': ContextVarStorage,
+    'greenlet': GreenletStorage,
+}
+
+
+def get_storage(storage):
+    """
+    Return a new storage from its name in ``storages``, or storage itself.
+    """
+    if not isinstance(storage, string_types):
+        return storage
+    try:
+        return storages[storage]()
+    except KeyError:
+        raise ValueError('Unknown storage %r, choose one of %s.' % (
+            storage, ', '.join(sorted(storages))))
@@ -0,0 +1,13 @@
+import asyncio
+
+
+def run_tasks(workers):
+    # Run worker generators as asyncio tasks, switching at each yield.
+    async def run(worker):
+        for _ in worker:
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(*[run(worker) for worker in workers])
+
+    asyncio.run(main())
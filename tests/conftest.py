@@ -0,0 +1,12 @@
+import sys
+
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # async syntax
+    collect_ignore.extend([
+        'async_runner.py', 'test_asyncio.py', 'test_django_async.py',
+    ])
+if sys.version_info < (3,):
+    # concurrent.futures
+    collect_ignore.append('test_futures.py')
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from pylogctx.core import Context
+from pylogctx.storage import contextvars, ContextVarStorage
+
+
+pytestmark = pytest.mark.skipif(contextvars is None,
+                                reason="contextvars requires Python 3.7")
+
+
+@pytest.fixture()
+def context():
+    return Context(storage=ContextVarStorage())
+
+
+def test_contextvars_api(context):
+    context.update(rid=42, tags=['a'])
+    with context(tags=['b']):
+        assert context.as_dict() == {'rid': 42, 'tags': ['a', 'b']}
+    context.remove('rid')
+    assert context.as_dict() == {'tags': ['a']}
+    context.clear()
+    assert not context.as_dict()
+
+
+def test_contextvars_tasks_isolated(context):
+    context.update(rid=42)
+
+    async def worker(i):
+        with context(task=i):
+            await asyncio.sleep(0)
+            context.update(tags=[i])
+            await asyncio.sleep(0)
+            return context.as_dict()
+
+    async def main():
+        return await asyncio.gather(*[worker(i) for i in range(100)])
+
+    results = asyncio.run(main())
+    assert results == [
+        {'rid': 42, 'task': i, 'tags': [i]} for i in range(100)]
+    # Tasks do not leak in creator context.
+    assert context.as_dict() == {'rid': 42}
+
+
+def test_contextvars_task_inherits_snapshot(context):
+    async def child():
+        context.update(child=True)
+        return context.as_dict()
+
+    async def main():
+        context.update(rid=42)
+        task = asyncio.ensure_future(child())
+        # Updated after the task creation: not seen by the task.
+        context.update(parent=True)
+        return await task, context.as_dict()
+
+    child_fields, parent_fields = asyncio.run(main())
+    assert child_fields == {'rid': 42, 'child': True}
+    assert parent_fields == {'rid': 42, 'parent': True}
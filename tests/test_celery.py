@@ -1,7 +1,9 @@
+import json
+
 from celery import Celery, current_task
 from celery.utils.log import get_task_logger
 from celery import VERSION
-from mock import patch
+from mock import Mock, patch
 
 from pylogctx.celery import LoggingTask
 
@@ -107,3 +109,159 @@ def test_adapter():
     assert 'toto' in fields
 
     context.clear()  # Clear context
+
+
+def test_context_restored():
+    from pylogctx import context
+
+    app = Celery(task_cls=LoggingTask)
+
+    @app.task
+    def my_task():
+        context.update(taskField='RUNNED')
+        return context.as_dict()
+
+    context.update(rid=42)
+    with context(user='toto'):
+        result = my_task.apply()
+        # Task runs in a clean context.
+        assert result.result == {'taskField': 'RUNNED'}
+        assert context.as_dict() == {'rid': 42, 'user': 'toto'}
+    # Layers of the caller are preserved.
+    assert context.as_dict() == {'rid': 42}
+    context.clear()
+
+
+def test_task_scope():
+    from pylogctx import context
+
+    app = Celery(task_cls=LoggingTask)
+    listener = Mock()
+
+    @app.task
+    def my_task():
+        listener.run()
+
+    context.add_scope_listener(listener)
+    try:
+        my_task.apply()
+    finally:
+        context.remove_scope_listener(listener)
+    assert [name for name, _, _ in listener.method_calls] == [
+        'enter_scope', 'run', 'exit_scope']
+
+
+class FailingAfterCallTask(LoggingTask):
+    def after_call(self, *args, **kwargs):
+        raise ValueError('after_call')
+
+
+def test_task_scope_after_call_fails():
+    from pylogctx import context
+
+    app = Celery(task_cls=FailingAfterCallTask)
+    listener = Mock()
+
+    @app.task
+    def my_task():
+        pass
+
+    context.add_scope_listener(listener)
+    try:
+        my_task.apply()
+    finally:
+        context.remove_scope_listener(listener)
+    assert [name for name, _, _ in listener.method_calls] == [
+        'enter_scope', 'exit_scope']
+    assert not context.as_dict()
+
+
+def test_hook_inspected_once():
+    app = Celery(task_cls=LoggingTask)
+
+    @app.task
+    def my_task():
+        pass
+
+    with patch('pylogctx.celery.getargspec') as getargspec:
+        getargspec.return_value.varargs = 'args'
+        my_task.apply()
+        my_task.apply()
+    assert getargspec.call_count == 2  # before_call and after_call
+
+
+class PropagatingTask(LoggingTask):
+    context_headers = ('rid', 'userId', 'big')
+    context_headers_max_size = 64
+
+    def before_call(self, *args, **kwargs):
+        from pylogctx import context
+        context.update(seen=context.get('rid'))
+
+
+def test_context_headers():
+    from celery.contrib.testing.worker import start_worker
+    from pylogctx import context
+
+    app = Celery(broker='memory://', backend='cache+memory://',
+                 task_cls=PropagatingTask)
+
+    @app.task(name='test_context_headers')
+    def my_task():
+        return context.as_dict()
+
+    context.update(rid=42, userId='toto', secret='s3cr3t', big='x' * 64)
+    try:
+        with start_worker(app, pool='solo', perform_ping_check=False):
+            result = my_task.delay()
+            fields = result.get(timeout=10)
+    finally:
+        context.clear()
+
+    # Only allowed fields which fit are sent, and restored before
+    # before_call.
+    assert fields['rid'] == 42
+    assert fields['userId'] == 'toto'
+    assert fields['seen'] == 42
+    assert 'secret' not in fields
+    assert 'big' not in fields
+
+
+def test_context_headers_freeze():
+    from pylogctx import context
+
+    class FrozenTask(LoggingTask):
+        context_headers = ('user', 'groups')
+
+    app = Celery(task_cls=FrozenTask)
+
+    @app.task
+    def my_task():
+        pass
+
+    context.freeze = True
+    del context._stack
+    try:
+        context.update(user={'id': 1}, groups={'staff'})
+        encoded = my_task._encode_context()
+    finally:
+        context.freeze = False
+        del context._stack
+    # Frozen values are sent as the dicts and lists they stand for.
+    assert json.loads(encoded) == {'user': {'id': 1}, 'groups': ['staff']}
+
+
+def test_context_headers_disabled():
+    from pylogctx import context
+
+    app = Celery(task_cls=LoggingTask)
+
+    @app.task
+    def my_task():
+        return context.as_dict()
+
+    context.update(rid=42)
+    with patch('celery.app.task.Task.apply_async') as apply_async:
+        my_task.delay()
+    context.clear()
+    assert 'headers' not in apply_async.call_args[1]
@@ -3,10 +3,12 @@ from __future__ import unicode_literals
 
 import copy
 from logging import LogRecord
+import pickle
 import sys
 import threading
+import time
 
-from mock import patch
+from mock import Mock, patch
 import pytest
 import six
 
@@ -41,6 +43,47 @@ def test_formatter_with_context(record, context):
     assert log.strip() == '{} {}'.format(record.message, 'rid:42')
 
 
+def test_formatter_cache(record, context):
+    formatter = AddContextFormatter()
+    assert formatter.format(record).endswith(' rid:42')
+    with log_context(user='toto'):
+        assert formatter.format(record).endswith(' rid:42 user:toto')
+    assert formatter.format(record).endswith(' rid:42')
+
+
+def test_formatter_lazy(record, context):
+    from pylogctx import LazyAccessor
+
+    class MyObject(object):
+        status = 1
+
+    instance = MyObject()
+    log_context.update(status={'value': LazyAccessor(instance, 'status')})
+    formatter = AddContextFormatter()
+    assert formatter.format(record).endswith(
+        " rid:42 status:{'value': 1}")
+    # Lazy fields are rendered again on each record.
+    instance.status = 2
+    assert formatter.format(record).endswith(
+        " rid:42 status:{'value': 2}")
+
+
+def test_formatter_thread(record, context):
+    formatter = AddContextFormatter()
+    assert formatter.format(record).endswith(' rid:42')
+    logs = []
+
+    def child():
+        log_context.update(child=True)
+        logs.append(formatter.format(record))
+
+    thread = threading.Thread(target=child)
+    thread.start()
+    thread.join()
+    assert logs[0].endswith(' child:True')
+    assert formatter.format(record).endswith(' rid:42')
+
+
 def test_filter_no_context_no_default(record):
     original_record = copy.deepcopy(record)
     AddContextFilter().filter(record)
@@ -60,6 +103,50 @@ def test_filter_with_context(record, context):
     assert original_record.__dict__ == record.__dict__
 
 
+def test_filter_zero_copy(record, context):
+    from logging import Formatter
+
+    filter_ = AddContextFilter(default={'user': None}, zero_copy=True)
+    with log_context(user='toto'):
+        filter_.filter(record)
+        # Filtering again only updates the attached snapshot.
+        filter_.filter(record)
+    assert record.rid == 42
+    assert record.user == 'toto'
+    assert record.msg == "waagh :("
+    assert isinstance(record, LogRecord)
+    assert not hasattr(record, 'missing')
+    # Context is referenced, not copied.
+    assert 'rid' not in record.__dict__
+
+    log = Formatter('%(rid)s %(user)s %(message)s').format(record)
+    assert log == '42 toto waagh :('
+
+    log_context.remove('rid')
+    filter_.filter(record)
+    assert not hasattr(record, 'rid')
+
+
+def test_filter_zero_copy_copy(record, context):
+    filter_ = AddContextFilter(default={'user': None}, zero_copy=True)
+    filter_.filter(record)
+
+    copied = copy.copy(record)
+    assert copied is not record
+    assert copied.rid == 42
+    assert copied.user is None
+    assert 'rid' not in copied.__dict__
+    copied.msg = 'copied'
+    assert record.msg == "waagh :("
+
+    unpickled = pickle.loads(pickle.dumps(record))
+    assert type(unpickled) is LogRecord
+    assert unpickled.__dict__['rid'] == 42
+    assert unpickled.__dict__['user'] is None
+    assert unpickled.getMessage() == "waagh :("
+    assert record.user is None
+
+
 def test_update_clear_remove(context):
     log_context.update(myField='toto', myOtherField='titi')
     fields = log_context.as_dict()
@@ -95,6 +182,43 @@ def test_context_manager(context):
     assert 'myField' not in fields
 
 
+def test_snapshot_restore(context):
+    with log_context(myField='toto'):
+        token = log_context.snapshot()
+        log_context.update(myOtherField='titi')
+        log_context.restore()
+        assert not log_context.as_dict()
+        log_context.restore(token)
+        assert log_context.as_dict() == {'rid': 42, 'myField': 'toto'}
+    assert log_context.as_dict() == {'rid': 42}
+
+
+def test_isolated(context):
+    with log_context(myField='toto'):
+        token = log_context.snapshot()
+        with log_context.isolated():
+            assert not log_context.as_dict()
+            log_context.update(isolated=1)
+            with log_context.isolated(token):
+                log_context.update(nested=2)
+                assert log_context.as_dict() == {
+                    'rid': 42, 'myField': 'toto', 'nested': 2}
+            assert log_context.as_dict() == {'isolated': 1}
+        assert log_context.as_dict() == {'rid': 42, 'myField': 'toto'}
+    # The token did not change.
+    with log_context.isolated(token):
+        assert log_context.as_dict() == {'rid': 42, 'myField': 'toto'}
+    assert log_context.as_dict() == {'rid': 42}
+
+
+def test_isolated_exception(context):
+    with pytest.raises(ValueError):
+        with log_context.isolated():
+            with log_context(myField='toto'):
+                raise ValueError()
+    assert log_context.as_dict() == {'rid': 42}
+
+
 def test_deep_update_dict(context):
     log_context.remove('rid')
 
@@ -346,7 +470,438 @@ def test_lazy_accessor_deepupdate_nested(context):
     assert str(fields['parent']['lazy_instance']) == 'bar'
 
 
+def test_deferred(record, context):
+    from pylogctx import Deferred
+
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    log_context.update(user=Deferred(compute, 'toto'))
+    log_context.update(nested={'user': Deferred(compute, 'titi')})
+    with log_context(other=1):
+        log_context.as_dict()
+    assert not calls
+
+    formatter = AddContextFormatter('%(user)s %(message)s')
+    AddContextFilter().filter(record)
+    assert formatter.format(record) == (
+        "toto waagh :( rid:42 user:toto nested:{'user': " +
+        repr('titi') + "}")
+    formatter.format(record)
+    # Computed once, on first access.
+    assert calls == ['toto', 'titi']
+
+
+def test_deferred_threads():
+    from pylogctx import Deferred
+
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(.05)
+        return 'toto'
+
+    deferred = Deferred(compute)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(deferred.get()))
+               for _ in range(4)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['toto'] * 4
+    assert calls == [1]
+
+    # Values holding it share it rather than copying it.
+    log_context.update(users=[deferred])
+    assert log_context.get('users')[0] is deferred
+    assert pickle.loads(pickle.dumps(deferred)).get() == 'toto'
+    del log_context._stack
+
+
 def test_filter_exc_info(record):
     record.exc_info = object()
     ExcInfoFilter().filter(record)
     assert not record.exc_info
+
+
+def test_version_bumps_on_changes(context):
+    versions = [log_context.version]
+
+    log_context.update(myField='toto')
+    versions.append(log_context.version)
+    log_context.remove('myField')
+    versions.append(log_context.version)
+    with log_context(myOtherField='titi'):
+        versions.append(log_context.version)
+    # Leaving the block restores the previous content, thus version.
+    assert log_context.version == versions[-2]
+    log_context.clear()
+    versions.append(log_context.version)
+
+    assert len(set(versions)) == len(versions)
+
+
+def test_as_dict_cached(context):
+    assert log_context._merged() is log_context._merged()
+
+    fields = log_context.as_dict()
+    fields['myField'] = 'toto'
+    assert 'myField' not in log_context.as_dict()
+
+    cached = log_context._merged()
+    log_context.update(myField='toto')
+    assert log_context._merged() is not cached
+    assert log_context.as_dict() == {'rid': 42, 'myField': 'toto'}
+
+
+def test_failed_update_changes_version(context):
+    log_context.update(tags='a')
+    log_context.as_dict()
+    with pytest.raises(AttributeError):
+        # Can not extend a string, after y was set.
+        log_context.update(y=2, tags=['b'])
+    assert log_context.as_dict() == dict(log_context.data)
+
+
+def test_data_changes_version(context):
+    version = log_context.version
+    log_context.as_dict()
+    log_context.data['myField'] = 'toto'
+    assert log_context.version != version
+    assert log_context.as_dict() == {'rid': 42, 'myField': 'toto'}
+
+
+def test_as_dict_copy(context):
+    name = 'x' * 100
+    log_context.update(tags=['a'], user={'id': 1}, items=[{'id': 1}],
+                       groups={'staff'}, name=name)
+    fields = log_context.as_dict()
+    fields['tags'].append('x')
+    fields['user']['id'] = 2
+    fields['items'][0]['id'] = 2
+    fields['groups'].add('admin')
+    assert log_context.as_dict() == {
+        'rid': 42, 'tags': ['a'], 'user': {'id': 1}, 'items': [{'id': 1}],
+        'groups': {'staff'}, 'name': name}
+    # Values which can not be changed in place are shared.
+    assert fields['name'] is log_context.get('name')
+
+
+def test_filter_copy(record, context):
+    log_context.update(tags=['a'])
+    AddContextFilter().filter(record)
+    record.tags.append('x')
+    assert log_context.get('tags') == ['a']
+
+
+@pytest.fixture(params=[False, True], ids=['copy', 'freeze'])
+def freeze(request, context):
+    log_context.freeze = request.param
+    # Restart with a stack of the right kind.
+    del log_context._stack
+    log_context.update(rid=42)
+    yield request.param
+    log_context.freeze = False
+
+
+@pytest.mark.parametrize("layers, key, result", [
+    ([{'k': 'a'}, {'k': 'b'}], 'k', 'b'),
+    ([{'k': 'a'}, {}], 'k', 'a'),
+    ([{}, {'k': 'a'}], 'k', 'a'),
+    ([{'k': ['a']}, {'k': ['b']}, {'k': ['c']}], 'k', ['a', 'b', 'c']),
+    ([{'k': ['a']}, {'k': 'b'}], 'k', 'b'),
+    ([{'k': ['a']}, {'k': None}, {'k': ['c']}], 'k', ['c']),
+    ([{'k': {'a'}}, {'k': {'b'}}], 'k', {'a', 'b'}),
+    ([{'k': {'a': 1, 'b': {'c': 1}}}, {'k': {'b': {'d': 2}}}],
+     'k', {'a': 1, 'b': {'c': 1, 'd': 2}}),
+    ([{'k': {'a': 1}}, {'k': {'a': 2}}], 'k', {'a': 2}),
+    ([{'k': 'a'}, {'k': None}], 'k', None),
+    ([{'k': 'a'}, {'other': 'b'}], 'missing', None),
+])
+def test_layers_merge(freeze, layers, key, result):
+    log_context.clear()
+
+    def check(layers):
+        if not layers:
+            assert log_context.as_dict().get(key) == result
+            # Resolve with a cold cache first, then a warm one.
+            assert log_context.get(key) == result
+            assert log_context.get(key) == result
+            return
+        with log_context(**layers[0]):
+            check(layers[1:])
+
+    check(layers)
+    # Layers did not leak in the bottom of the stack.
+    assert not log_context.as_dict()
+
+
+def test_layers_update_inner(freeze):
+    with log_context(tags=['a']):
+        log_context.as_dict()
+        with log_context(tags=['b']):
+            log_context.update(tags=['c'])
+            assert log_context.get('tags') == ['a', 'b', 'c']
+        log_context.update(tags=['d'])
+        assert log_context.get('tags') == ['a', 'd']
+    assert log_context.as_dict() == {'rid': 42}
+
+
+def test_layers_pop_unseals(freeze):
+    log_context.update(tags=['a'])
+    layer = log_context._layer()
+    with log_context(step=1):
+        pass
+    log_context.update(tags=['b'])
+    # Popping let the layer be updated in place again, rather than copied.
+    assert log_context._layer() is layer
+    assert log_context.get('tags') == ['a', 'b']
+
+
+def test_layers_pop_pinned(freeze):
+    log_context.update(tags=['a'], user={'groups': ['x']})
+    with log_context(step=1):
+        token = log_context.snapshot()
+        log_context.update(step=2)
+    log_context.update(tags=['b'], user={'groups': ['y']})
+    assert log_context.get('tags') == ['a', 'b']
+    with log_context.isolated(token):
+        assert log_context.as_dict() == {
+            'rid': 42, 'tags': ['a'], 'user': {'groups': ['x']}, 'step': 1}
+
+
+def test_layers_get_cached(freeze):
+    log_context.update(tags=['a'], user='x')
+    with log_context(step=1):
+        with log_context(step=2):
+            assert log_context.get('tags') == ['a']
+            log_context.update(tags=['b'])
+            assert log_context.get('tags') == ['a', 'b']
+            assert log_context.get('user') == 'x'
+        # Resolved values cached below were not changed by the popped layer.
+        assert log_context.get('tags') == ['a']
+        log_context.update(user='y', tags=['c'])
+        assert log_context.get('user') == 'y'
+        assert log_context.get('tags') == ['a', 'c']
+        assert log_context.get('missing', 0) == 0
+    assert log_context.get('tags') == ['a']
+    assert log_context.get('user') == 'x'
+
+
+def test_layers_deep(context):
+    depth = 5000
+    cms = [log_context(level=i) for i in range(depth)]
+    for cm in cms:
+        cm.__enter__()
+    assert log_context.get('level') == depth - 1
+    assert log_context.as_dict()['rid'] == 42
+    for cm in reversed(cms):
+        cm.__exit__(None, None, None)
+    assert log_context.as_dict() == {'rid': 42}
+
+
+@patch.dict('pylogctx.core._adapter_mapping')
+def test_adapter_cache(context):
+    from pylogctx import AdapterNotFound, log_adapter
+    from pylogctx.core import adapt
+
+    class Parent(object):
+        pass
+
+    class Child(Parent):
+        pass
+
+    with pytest.raises(AdapterNotFound):
+        adapt(Child())
+    # Registering drops the negative result.
+    log_adapter(Parent)(lambda instance: {'class': 'parent'})
+    assert adapt(Child()) == {'class': 'parent'}
+    # Registering a closer class overrides the cached adapter.
+    log_adapter(Child)(lambda instance: {'class': 'child'})
+    assert adapt(Child()) == {'class': 'child'}
+
+    # Unregistering is detected too.
+    from pylogctx.core import _adapter_mapping
+    del _adapter_mapping[Child]
+    assert adapt(Child()) == {'class': 'parent'}
+
+
+class Model(object):
+    def __init__(self, pk):
+        self.pk = pk
+
+
+@patch.dict('pylogctx.core._adapter_mapping')
+def test_adapter_memoize(context):
+    from pylogctx import log_adapter
+
+    calls = []
+
+    @log_adapter(Model, memoize=True, maxsize=2)
+    def adapt_model(instance, prefix='model'):
+        calls.append(instance.pk)
+        return {prefix + 'Id': instance.pk}
+
+    first, second, third = Model(1), Model(2), Model(3)
+    with log_context(first):
+        with log_context(first):
+            log_context.update_one(first, prefix='other')
+            assert log_context.as_dict() == {
+                'rid': 42, 'modelId': 1, 'otherId': 1}
+    assert calls == [1, 1]
+    assert (adapt_model.hits, adapt_model.misses) == (1, 2)
+
+    # Least recently used entries are evicted.
+    log_context.update(second, third, first)
+    assert calls == [1, 1, 2, 3, 1]
+
+    adapt_model.invalidate(first)
+    log_context.update(first, third)
+    assert calls == [1, 1, 2, 3, 1, 1]
+    adapt_model.invalidate()
+    log_context.update(third)
+    assert calls == [1, 1, 2, 3, 1, 1, 3]
+
+
+@patch.dict('pylogctx.core._adapter_mapping')
+@patch('pylogctx.core._clock')
+def test_adapter_memoize_ttl(clock, context):
+    from pylogctx import log_adapter
+
+    adapter = log_adapter(Model, memoize=True, ttl=10)(
+        lambda instance: {'modelId': instance.pk})
+    model = Model(1)
+    clock.return_value = 0
+    log_context.update(model)
+    clock.return_value = 9
+    log_context.update(model)
+    assert adapter.misses == 1
+    clock.return_value = 11
+    log_context.update(model)
+    assert adapter.misses == 2
+
+
+@patch.dict('pylogctx.core._adapter_mapping')
+def test_adapter_memoize_release(context):
+    import gc
+    import weakref
+    from pylogctx import log_adapter
+
+    adapter = log_adapter(Model, memoize=True)(
+        lambda instance: {'modelId': instance.pk})
+    model = Model(1)
+    ref = weakref.ref(model)
+    log_context.update(model)
+    assert len(adapter._entries) == 1
+    del model
+    gc.collect()
+    assert ref() is None
+    # A new object may reuse the id of the released one.
+    other = Model(2)
+    log_context.update(other)
+    assert log_context.get('modelId') == 2
+    assert len(adapter._entries) == 1
+
+
+@patch.dict('pylogctx.core._adapter_mapping')
+def test_adapter_memoize_not_weakrefable(context):
+    from pylogctx import log_adapter
+
+    class Slotted(object):
+        __slots__ = ('pk',)
+
+    adapter = log_adapter(Slotted, memoize=True)(
+        lambda instance, **kw: {'slottedId': 1})
+    log_context.update(Slotted())
+    log_context.update_one(Slotted(), tags=['unhashable'])
+    assert adapter.misses == 2
+    assert not adapter._entries
+
+
+def test_freeze_shares_values():
+    from pylogctx.core import Context
+    log_context = Context(freeze=True)
+
+    payload = {'items': list(range(10)), 'nested': {'a': {'b': [1]}}}
+    log_context.update(payload=payload)
+    stored = log_context.get('payload')
+    # Values are frozen once, then shared.
+    with log_context(other=1):
+        assert log_context.get('payload') is stored
+        assert log_context.as_dict()['payload'] is stored
+    with pytest.raises(TypeError):
+        stored['items'] = []
+    assert stored == payload
+
+    # Merging builds a new value and leaves the shared one untouched.
+    with log_context(payload={'nested': {'a': {'b': [2]}}}):
+        assert log_context.get('payload')['nested'] == {'a': {'b': [1, 2]}}
+    assert stored['nested'] == {'a': {'b': [1]}}
+
+
+def test_limits(freeze):
+    from pylogctx.helpers import Limits
+
+    log_context.limits = Limits(max_items=3)
+    try:
+        for i in range(100):
+            log_context.update(path=[i])
+        assert log_context.get('path') == [97, 98, 99]
+        # Limits apply to each level of the stack.
+        with log_context(path=[100]):
+            assert log_context.get('path') == [97, 98, 99, 100]
+    finally:
+        log_context.limits = None
+
+
+def test_scope_listeners(context):
+    listener = Mock()
+    log_context.add_scope_listener(listener)
+    try:
+        with log_context(step=1):
+            with log_context(step=2):
+                pass
+        with pytest.raises(ValueError):
+            with log_context(step=2):
+                raise ValueError()
+    finally:
+        log_context.remove_scope_listener(listener)
+    assert [name for name, _, _ in listener.method_calls] == [
+        'enter_scope', 'enter_scope', 'exit_scope', 'exit_scope',
+        'enter_scope', 'exit_scope',
+    ]
+    assert log_context.as_dict() == {'rid': 42}
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+def test_filter_batch(context, zero_copy):
+    filter_ = AddContextFilter(default={'step': None}, zero_copy=zero_copy)
+    records = []
+    for step in (None, 1):
+        with log_context(**({'step': step} if step else {})):
+            for i in range(2):
+                record = LogRecord("foo", "INFO", "foo", 10, "waagh", (),
+                                   None)
+                record.pylogctx_snapshot = log_context.snapshot()
+                records.append(record)
+    # Records without snapshot get the current context.
+    records.append(LogRecord("foo", "INFO", "foo", 10, "waagh", (), None))
+
+    with patch.object(log_context, '_layer',
+                      wraps=log_context._layer) as layer:
+        filter_.filter_batch(records)
+    assert layer.call_count == 1
+    assert [(r.rid, r.step) for r in records] == [
+        (42, None), (42, None), (42, 1), (42, 1), (42, None)]
+    if zero_copy:
+        # Records of the same context share their fields.
+        assert records[0].__dict__.fields is records[1].__dict__.fields
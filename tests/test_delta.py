@@ -0,0 +1,128 @@
+import logging
+import re
+import threading
+
+from mock import patch
+import pytest
+import six
+
+from pylogctx import AddContextFormatter, context
+from pylogctx.core import LazyAccessor
+from pylogctx.delta import DeltaContextFormatter, decode
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger('pylogctx.tests.delta')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger
+    logger.handlers = []
+    del context._stack
+
+
+def capture(logger, formatter):
+    stream = six.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    return stream
+
+
+def test_delta(logger):
+    delta = capture(logger, DeltaContextFormatter(every=3))
+    full = capture(logger, AddContextFormatter())
+
+    logger.info('empty')
+    for rid in range(2):
+        with context(rid=rid, user={'id': 42}):
+            for i in range(4):
+                logger.info('record %d', i)
+
+    lines = delta.getvalue().splitlines()
+    assert re.match(r'^empty @\d+-\d+= $', lines[0])
+    assert lines[1].endswith('= rid:0 user:{\'id\': 42}')
+    assert '=' not in lines[2]
+    assert '=' not in lines[3]
+    # Full context again every 3 records.
+    assert lines[4].endswith('= rid:0 user:{\'id\': 42}')
+    assert lines[5].endswith('= rid:1 user:{\'id\': 42}')
+    assert list(decode(six.StringIO(delta.getvalue()))) == list(
+        six.StringIO(full.getvalue()))
+
+
+def test_delta_lazy(logger):
+    class User(object):
+        name = 'toto'
+    user = User()
+    delta = capture(logger, DeltaContextFormatter())
+    full = capture(logger, AddContextFormatter())
+
+    with context(name=LazyAccessor(user, 'name')):
+        logger.info('first')
+        user.name = 'tata'
+        logger.info('second')
+
+    assert delta.getvalue().count('=') == 2
+    assert list(decode(six.StringIO(delta.getvalue()))) == list(
+        six.StringIO(full.getvalue()))
+
+
+def test_delta_threads(logger):
+    delta = capture(logger, DeltaContextFormatter())
+    full = capture(logger, AddContextFormatter())
+
+    def worker(rid):
+        with context(rid=rid):
+            for i in range(50):
+                logger.info('%s', rid)
+
+    threads = [threading.Thread(target=worker, args=(rid,))
+               for rid in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = list(decode(six.StringIO(delta.getvalue())))
+    assert sorted(lines) == sorted(six.StringIO(full.getvalue()))
+    for line in lines:
+        rid, context_ = line.split(' ', 1)
+        assert context_ == 'rid:%s\n' % rid
+
+
+def test_delta_fork(logger):
+    delta = capture(logger, DeltaContextFormatter())
+
+    with context(rid=1):
+        logger.info('parent')
+        with patch('pylogctx.delta.os.getpid', return_value=1):
+            # A forked child does not reference the context of its parent.
+            logger.info('child')
+
+    lines = delta.getvalue().splitlines()
+    assert '= rid:1' in lines[0]
+    assert '= rid:1' in lines[1]
+
+
+def test_decode_unknown_reference():
+    lines = ['no context\n', 'missing @1-12\n', 'known @1-3= rid:1',
+             'ref @1-3']
+    assert list(decode(lines)) == [
+        'no context\n', 'missing @1-12\n', 'known rid:1', 'ref rid:1',
+    ]
+
+
+def test_decode_reference_in_message():
+    lines = ['mail @1-3 @1-2= rid:1', 'reply @1-2 @1-3', 'to @1-2 @1-2']
+    assert list(decode(lines)) == [
+        'mail @1-3 rid:1', 'reply @1-2 @1-3', 'to @1-2 rid:1',
+    ]
+
+
+def test_decode_processes():
+    lines = ['parent @1-3= rid:1', 'child @2-3= rid:2', 'parent @1-3',
+             'child @2-3']
+    assert list(decode(lines)) == [
+        'parent rid:1', 'child rid:2', 'parent rid:1', 'child rid:2',
+    ]
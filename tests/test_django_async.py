@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from mock import Mock, patch
+
+from pylogctx import log_adapter
+from pylogctx.core import Context
+from pylogctx.django_async import (
+    ExtractRequestContextMiddleware,
+    OuterMiddleware,
+)
+from pylogctx.storage import contextvars, ContextVarStorage
+
+
+pytestmark = pytest.mark.skipif(contextvars is None,
+                                reason="contextvars requires Python 3.7")
+
+
+class Request(object):
+    def __init__(self, rid):
+        self.rid = rid
+
+
+@pytest.fixture()
+def log_context():
+    context = Context(storage=ContextVarStorage())
+    with patch('pylogctx.django_async.context', context):
+        yield context
+
+
+def _extractor(request):
+    return {'rid': request.rid}
+
+
+async def _view(log_context, request):
+    await asyncio.sleep(0)
+    fields = log_context.as_dict()
+    await asyncio.sleep(0)
+    assert log_context.as_dict() == fields
+    return fields
+
+
+@patch.dict('pylogctx.core._adapter_mapping')
+def test_async_isolated(log_context):
+    log_adapter(Request)(lambda request: {'rid': request.rid})
+
+    async def get_response(request):
+        return await _view(log_context, request)
+
+    middleware = OuterMiddleware(get_response)
+
+    async def main():
+        log_context.update(outer=True)
+        responses = await asyncio.gather(*[
+            middleware(Request(i)) for i in range(50)])
+        return responses, log_context.as_dict()
+
+    responses, fields = asyncio.run(main())
+    assert responses == [{'rid': i} for i in range(50)]
+    assert fields == {'outer': True}
+
+
+@patch('pylogctx.django_async.settings',
+       Mock(PYLOGCTX_REQUEST_EXTRACTOR=_extractor))
+def test_async_extract(log_context):
+    async def get_response(request):
+        return await _view(log_context, request)
+
+    middleware = ExtractRequestContextMiddleware(get_response)
+    assert asyncio.run(middleware(Request(42))) == {'rid': 42}
+    assert not log_context.as_dict()
+
+
+def test_async_requires_contextvars():
+    async def get_response(request):
+        pass
+
+    with pytest.raises(ImproperlyConfigured):
+        OuterMiddleware(get_response)
+
+
+@patch('pylogctx.django_async.settings',
+       Mock(PYLOGCTX_REQUEST_EXTRACTOR=_extractor))
+def test_sync(log_context):
+    def get_response(request):
+        return log_context.as_dict()
+
+    log_context.update(outer=True)
+    middleware = ExtractRequestContextMiddleware(get_response)
+    assert middleware(Request(42)) == {'rid': 42}
+    assert log_context.as_dict() == {'outer': True}
+
+
+def test_sync_scope(log_context):
+    listener = Mock()
+
+    def get_response(request):
+        listener.view()
+
+    log_context.add_scope_listener(listener)
+    OuterMiddleware(get_response)(Request(42))
+    assert [name for name, _, _ in listener.method_calls] == [
+        'enter_scope', 'view', 'exit_scope']
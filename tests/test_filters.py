@@ -0,0 +1,204 @@
+import gc
+import logging
+import threading
+
+import pytest
+from mock import patch
+
+from pylogctx import context
+from pylogctx.filters import (
+    LevelOverrideFilter, ProjectionFilter, RateLimitFilter,
+)
+
+
+def make_record(level):
+    return logging.LogRecord('foo', level, 'foo', 10, 'waagh', (), None)
+
+
+@pytest.fixture
+def clean_context():
+    yield context
+    del context._stack
+
+
+def test_level_override(clean_context):
+    filter_ = LevelOverrideFilter('INFO', [
+        ({'userId': 42}, logging.DEBUG),
+        ({'userId': 42, 'tenant': 'acme'}, 5),
+        ({'tenant': 'acme'}, logging.WARNING),
+    ])
+    assert filter_.filter(make_record(logging.INFO))
+    assert not filter_.filter(make_record(logging.DEBUG))
+
+    with context(userId=42):
+        assert filter_.filter(make_record(logging.DEBUG))
+        assert not filter_.filter(make_record(5))
+        with context(tenant='acme'):
+            # Lowest level of the matching rules.
+            assert filter_.filter(make_record(5))
+        assert not filter_.filter(make_record(5))
+
+    with context(userId=43):
+        assert not filter_.filter(make_record(logging.DEBUG))
+    assert not filter_.filter(make_record(logging.DEBUG))
+
+
+def test_level_override_set_rules(clean_context):
+    filter_ = LevelOverrideFilter(logging.INFO)
+    context.update(userId=42)
+    assert not filter_.filter(make_record(logging.DEBUG))
+    filter_.set_rules([({'userId': 42}, 'DEBUG')])
+    assert filter_.filter(make_record(logging.DEBUG))
+
+
+def test_level_override_unknown_level():
+    with pytest.raises(ValueError):
+        LevelOverrideFilter('VERBOSE')
+
+
+@pytest.fixture
+def rate_limit(clean_context):
+    filter_ = RateLimitFilter(keys=('rid',), rate=1, burst=2, max_keys=2)
+    yield filter_
+    filter_.close()
+
+
+@patch('pylogctx.filters._clock')
+def test_rate_limit(clock, rate_limit):
+    clock.return_value = 0
+    with context(rid=1):
+        assert [rate_limit.filter(make_record(logging.WARNING))
+                for i in range(3)] == [True, True, False]
+    with context(rid=2):
+        # Keys are limited on their own.
+        assert rate_limit.filter(make_record(logging.WARNING))
+    clock.return_value = 1.5
+    with context(rid=1):
+        assert rate_limit.filter(make_record(logging.WARNING))
+        assert not rate_limit.filter(make_record(logging.WARNING))
+
+
+@patch('pylogctx.filters._clock')
+def test_rate_limit_lru(clock, rate_limit):
+    clock.return_value = 0
+    for rid in (1, 2, 1, 3):
+        context.update(rid=rid)
+        rate_limit.filter(make_record(logging.WARNING))
+    # Least recently used key was evicted.
+    assert list(rate_limit._buckets) == [(1,), (3,)]
+
+
+def test_rate_limit_unhashable(rate_limit):
+    with context(rid=[1]):
+        assert rate_limit.filter(make_record(logging.WARNING))
+    assert list(rate_limit._buckets) == [('[1]',)]
+
+
+def test_rate_limit_released(clean_context):
+    listeners = context.scope_listeners
+    filter_ = RateLimitFilter()
+    assert len(context.scope_listeners) == len(listeners) + 1
+    # Logging never closes filters.
+    del filter_
+    gc.collect()
+    assert context.scope_listeners == listeners
+
+
+@patch('pylogctx.filters.random')
+def test_sample(random, clean_context):
+    filter_ = RateLimitFilter(sample=0.5)
+    random.random.side_effect = [0.1, 0.7, 0.2]
+    assert [filter_.filter(make_record(logging.INFO)) for i in range(3)] == [
+        True, False, True]
+    filter_.close()
+
+
+def test_rate_limit_summary(rate_limit):
+    summaries = []
+    summary_logger = rate_limit.summary_logger
+    # Other tests configure logging.
+    summary_logger.disabled = False
+    summary_logger.setLevel(logging.WARNING)
+    handler = logging.Handler()
+    handler.addFilter(rate_limit)
+    handler.emit = summaries.append
+    summary_logger.addHandler(handler)
+    try:
+        with context(rid=1):
+            with context(step=1):
+                for i in range(5):
+                    handler.handle(make_record(logging.WARNING))
+            # Summaries wait for the end of the outermost scope.
+            assert len(summaries) == 2
+        with context(rid=2):
+            handler.handle(make_record(logging.WARNING))
+    finally:
+        summary_logger.removeHandler(handler)
+        summary_logger.setLevel(logging.NOTSET)
+
+    assert len(summaries) == 4
+    summary = summaries[2]
+    assert summary.getMessage() == '3 records suppressed for rid:1'
+    assert summary.suppressed == 3
+
+
+def test_rate_limit_threads(clean_context):
+    filter_ = RateLimitFilter(keys=('rid',), rate=1e-9, burst=10)
+    passed = []
+
+    def worker(rid):
+        with context(rid=rid % 4):
+            passed.append(sum(
+                filter_.filter(make_record(logging.WARNING))
+                for i in range(1000)))
+
+    threads = [threading.Thread(target=worker, args=(rid,))
+               for rid in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    filter_.close()
+    # Burst of each of the 4 keys, whatever the interleaving.
+    assert sum(passed) == 40
+
+
+@pytest.mark.parametrize('freeze', [False, True], ids=['copy', 'freeze'])
+def test_projection(freeze, clean_context):
+    context.freeze = freeze
+    try:
+        filter_ = ProjectionFilter(
+            ['rid', 'user.id', ('user', 'groups'), 'tenant', 'missing.key'],
+            defaults={'tenant': '-'})
+        context.update(rid=42, user={'id': 1}, other='hidden')
+        with context(user={'groups': ['staff']}):
+            record = make_record(logging.INFO)
+            assert filter_.filter(record)
+    finally:
+        context.freeze = False
+    assert record.rid == 42
+    assert getattr(record, 'user.id') == 1
+    assert getattr(record, 'user.groups') == ['staff']
+    assert record.tenant == '-'
+    assert not hasattr(record, 'other')
+    assert not hasattr(record, 'missing.key')
+
+
+def test_projection_mapping(clean_context):
+    filter_ = ProjectionFilter({'userId': 'user.id'})
+    context.update(user={'id': 1})
+    record = make_record(logging.INFO)
+    filter_.filter(record)
+    assert record.userId == 1
+    context.update(user={'id': 2})
+    filter_.filter(record)
+    assert record.userId == 2
+
+
+def test_projection_copy(clean_context):
+    filter_ = ProjectionFilter(['tags'])
+    context.update(tags=['a'])
+    record = make_record(logging.INFO)
+    filter_.filter(record)
+    record.tags.append('x')
+    assert context.get('tags') == ['a']
@@ -0,0 +1,74 @@
+import pytest
+
+from pylogctx import context as log_context, LazyAccessor
+from pylogctx.futures import (
+    ContextProcessPoolExecutor,
+    ContextThreadPoolExecutor,
+)
+
+
+@pytest.fixture
+def context():
+    log_context.update(rid=42)
+    yield log_context
+    del log_context._stack
+
+
+def fields(item=None):
+    if item is not None:
+        log_context.update(item=item)
+    return log_context.as_dict()
+
+
+def test_thread_pool(context):
+    with ContextThreadPoolExecutor(max_workers=2) as executor:
+        with log_context(user='toto'):
+            future = executor.submit(fields)
+        assert future.result() == {'rid': 42, 'user': 'toto'}
+
+        results = list(executor.map(fields, range(4)))
+        assert results == [{'rid': 42, 'item': i} for i in range(4)]
+
+        # Workers do not keep the context once done.
+        log_context.clear()
+        assert executor.submit(fields).result() == {}
+
+    # Workers changes do not leak in the caller context.
+    assert log_context.as_dict() == {}
+
+
+class Status(object):
+    value = 'running'
+
+
+def test_process_pool(context):
+    log_context.update(status=LazyAccessor(Status(), 'value'),
+                       tags=['a'], coords=(1, 2))
+    with ContextProcessPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fields)
+        assert future.result() == {
+            'rid': 42, 'status': 'running', 'tags': ['a'], 'coords': (1, 2)}
+        assert type(future.result()['coords']) is tuple
+
+        results = list(executor.map(fields, range(2)))
+        assert [r['item'] for r in results] == [0, 1]
+
+        # Lazy fields are evaluated on each submit.
+        status = Status()
+        log_context.update(status=LazyAccessor(status, 'value'))
+        assert executor.submit(fields).result()['status'] == 'running'
+        status.value = 'done'
+        assert executor.submit(fields).result()['status'] == 'done'
+
+
+def test_process_pool_freeze(context):
+    log_context.freeze = True
+    del log_context._stack
+    try:
+        log_context.update(tags=['a'], coords=(1, [2]))
+        with ContextProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(fields).result()
+    finally:
+        log_context.freeze = False
+    assert result == {'tags': ['a'], 'coords': (1, [2])}
+    assert type(result['coords']) is tuple
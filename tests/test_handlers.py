@@ -0,0 +1,226 @@
+import gc
+import logging
+import threading
+import weakref
+
+import pytest
+import six
+from six.moves import queue
+
+from pylogctx import AddContextFilter, AddContextFormatter, context
+from pylogctx import handlers
+from pylogctx.handlers import ContextMemoryHandler, FingersCrossedHandler
+
+
+requires_queue = pytest.mark.skipif(
+    handlers.QueueHandler is None,
+    reason="QueueHandler requires Python 3.2")
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger('pylogctx.tests.handlers')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger
+    logger.handlers = []
+
+
+@requires_queue
+def test_queue_attribution(logger):
+    records = queue.Queue()
+    stream = six.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.addFilter(AddContextFilter(default={'rid': None}))
+    handler.setFormatter(AddContextFormatter('%(rid)s %(message)s'))
+    listener = handlers.ContextQueueListener(records, handler)
+    logger.addHandler(handlers.ContextQueueHandler(records))
+
+    def worker(rid):
+        with context(rid=rid):
+            for i in range(50):
+                logger.info('%s', rid)
+
+    listener.start()
+    try:
+        threads = [threading.Thread(target=worker, args=(rid,))
+                   for rid in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        listener.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 400
+    for line in lines:
+        rid, message, suffix = line.split()
+        assert rid == message
+        assert suffix == 'rid:%s' % rid
+    # Listener thread context was restored.
+    assert not context.as_dict()
+
+
+@requires_queue
+def test_queue_snapshot_at_enqueue(logger):
+    records = queue.Queue()
+    stream = six.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(AddContextFormatter('%(message)s'))
+    logger.addHandler(handlers.ContextQueueHandler(records))
+
+    context.update(rid=42)
+    logger.info('first')
+    context.update(rid=43, user='toto')
+    logger.info('second')
+    context.clear()
+
+    listener = handlers.ContextQueueListener(records, handler)
+    listener.start()
+    listener.stop()
+    assert stream.getvalue().splitlines() == [
+        'first rid:42', 'second rid:43 user:toto']
+
+
+@pytest.fixture
+def fingers_crossed(logger):
+    stream = six.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(AddContextFormatter('%(levelname)s %(message)s'))
+    handler = FingersCrossedHandler(target, capacity=3)
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    yield handler, stream
+    handler.close()
+    assert handler not in context.scope_listeners
+
+
+def test_fingers_crossed_discard(logger, fingers_crossed):
+    handler, stream = fingers_crossed
+    with context(rid=1):
+        logger.debug('hidden')
+        with context(step=1):
+            logger.info('hidden too')
+        assert handler.storage.get() is not None
+    assert handler.storage.get() is None
+    logger.info('outside')
+    assert stream.getvalue().splitlines() == ['INFO outside ']
+
+
+def test_fingers_crossed_trigger(logger, fingers_crossed):
+    handler, stream = fingers_crossed
+    with context(rid=1):
+        for i in range(5):
+            with context(step=i):
+                logger.debug('step %d', i)
+        logger.error('failed')
+        logger.debug('after')
+    # Oldest records were dropped, buffered ones keep their context.
+    assert stream.getvalue().splitlines() == [
+        'DEBUG step 2 rid:1 step:2',
+        'DEBUG step 3 rid:1 step:3',
+        'DEBUG step 4 rid:1 step:4',
+        'ERROR failed rid:1',
+        'DEBUG after rid:1',
+    ]
+
+
+def test_fingers_crossed_bytes(logger, fingers_crossed):
+    handler, stream = fingers_crossed
+    handler.capacity = 100
+    handler.max_bytes = 10
+    with context(rid=1):
+        logger.debug('%s', 'a' * 6)
+        logger.debug('%s', 'b' * 6)
+        logger.error('failed')
+    assert stream.getvalue().splitlines() == [
+        'DEBUG bbbbbb rid:1', 'ERROR failed rid:1']
+
+
+def test_fingers_crossed_record_untouched(logger, fingers_crossed):
+    handler, stream = fingers_crossed
+    handler.max_bytes = 100
+    record = logging.LogRecord(
+        logger.name, logging.DEBUG, __file__, 1, 'step %d', (1,), None)
+    with context(rid=1):
+        handler.handle(record)
+    assert record.msg == 'step %d'
+    assert record.args == (1,)
+    assert not hasattr(record, 'pylogctx_snapshot')
+
+
+def test_fingers_crossed_bad_args(logger, fingers_crossed):
+    handler, stream = fingers_crossed
+    handler.max_bytes = 100
+    errors = []
+    handler.handleError = errors.append
+    record = logging.LogRecord(
+        logger.name, logging.DEBUG, __file__, 1, '%s %s', (1,), None)
+    with context(rid=1):
+        # Logging errors do not reach the application.
+        handler.handle(record)
+    assert len(errors) == 1
+
+
+def test_fingers_crossed_release(logger, fingers_crossed):
+    class Payload(object):
+        pass
+    payload = Payload()
+    ref = weakref.ref(payload)
+    handler, stream = fingers_crossed
+    with context(rid=1):
+        # Not through the logger, which test tools capture.
+        handler.handle(logging.LogRecord(
+            logger.name, logging.DEBUG, __file__, 1, '%s', (payload,), None))
+        del payload
+        gc.collect()
+        assert ref() is not None
+    gc.collect()
+    assert ref() is None
+
+
+def test_fingers_crossed_threads(logger, fingers_crossed):
+    handler, stream = fingers_crossed
+    handler.capacity = 100
+
+    def worker(rid):
+        with context(rid=rid):
+            logger.debug('%s', rid)
+            if rid % 2:
+                logger.error('%s', rid)
+
+    threads = [threading.Thread(target=worker, args=(rid,))
+               for rid in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 8
+    for line in lines:
+        level, rid, suffix = line.split()
+        assert int(rid) % 2
+        assert suffix == 'rid:%s' % rid
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+def test_memory_handler(logger, zero_copy):
+    stream = six.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(logging.Formatter('%(message)s %(rid)s %(step)s'))
+    handler = ContextMemoryHandler(
+        100, target=target, default={'step': None}, zero_copy=zero_copy)
+    logger.addHandler(handler)
+
+    with context(rid=1):
+        logger.info('first')
+        logger.info('second')
+        with context(step=2):
+            logger.info('third')
+    handler.flush()
+
+    assert stream.getvalue().splitlines() == [
+        'first 1 None', 'second 1 None', 'third 1 2']
+    assert not handler.buffer
@@ -2,7 +2,10 @@
 from __future__ import unicode_literals
 
 import pytest
-from pylogctx.helpers import deepupdate
+from pylogctx.helpers import (
+    copycontainers, deepupdate, freeze, frozenupdate, FrozenDict, FrozenList,
+    FrozenSet, Limits,
+)
 
 
 @pytest.mark.parametrize("target, src, result", [
@@ -37,3 +40,92 @@ from pylogctx.helpers import deepupdate
 def test_deepupdate(target, src, result):
     deepupdate(target, src)
     assert target == result
+
+
+@pytest.mark.parametrize("target, src, result", [
+    ({}, {}, {}),
+    ({}, None, {}),
+    ({}, {'name': 'toto'}, {'name': 'toto'}),
+    ({'name': 'toto'}, {'name': 'tata'}, {'name': 'tata'}),
+    ({'hobbies': FrozenList(['programming'])},
+     {'hobbies': ['gaming']},
+     {'hobbies': ['programming', 'gaming']}),
+    ({'hobbies': None},
+     {'hobbies': ['gaming']},
+     {'hobbies': ['gaming']}),
+    ({'hobbies': FrozenSet({'programming'})},
+     {'hobbies': {'gaming'}},
+     {'hobbies': {'programming', 'gaming'}}),
+    ({'name': FrozenDict(toto=FrozenDict(a=1))},
+     {'name': {'toto': {'b': 2}, 'tata': 2}},
+     {'name': {'toto': {'a': 1, 'b': 2}, 'tata': 2}}),
+    ({'name': 'toto'}, {'point': (1, [2])}, {'name': 'toto',
+                                             'point': (1, [2])}),
+])
+def test_frozenupdate(target, src, result):
+    frozenupdate(target, src)
+    assert target == result
+
+
+def test_frozenupdate_shares_values():
+    hobbies = FrozenList(['programming'])
+    user = FrozenDict(name='toto')
+    target = {'hobbies': hobbies}
+    frozenupdate(target, {'hobbies': ['gaming'], 'user': user})
+    # Merge builds a new value, leaving the former one untouched.
+    assert hobbies == ['programming']
+    assert target['hobbies'] == ['programming', 'gaming']
+    # Frozen values are shared.
+    assert target['user'] is user
+
+
+def test_copycontainers():
+    point = (1, 2)
+    src = {'name': 'toto', 'point': point, 'hobbies': ['chess', {'a': 1}],
+           'user': {'groups': {'staff'}}}
+    copied = copycontainers(src)
+    assert copied == src
+    copied['hobbies'][1]['a'] = 2
+    copied['user']['groups'].add('admin')
+    assert src['hobbies'] == ['chess', {'a': 1}]
+    assert src['user'] == {'groups': {'staff'}}
+    assert copied['point'] is point
+
+
+def test_freeze():
+    value = freeze({'a': [1, {'b': {2}}], 'c': (3, [4]), 'd': (5, 6)})
+    assert isinstance(value, FrozenDict)
+    assert isinstance(value['a'], FrozenList)
+    assert isinstance(value['a'][1], FrozenDict)
+    assert isinstance(value['a'][1]['b'], FrozenSet)
+    assert isinstance(value['c'][1], FrozenList)
+    assert value == {'a': [1, {'b': {2}}], 'c': (3, [4]), 'd': (5, 6)}
+    assert freeze(value) is value
+    assert repr(value['a']) == repr([1, {'b': {2}}])
+    with pytest.raises(TypeError):
+        value['e'] = 1
+
+
+@pytest.mark.parametrize("update", [deepupdate, frozenupdate])
+def test_limits(update):
+    limits = Limits(max_keys=3, max_items=2, max_value_size=4)
+    target = {}
+    update(target, {'a': 'abcdef', 'b': [1, 2, 3], 'c': {4, 5, 6}}, limits)
+    update(target, {'b': [4], 'd': 1, 'c': {7}}, limits)
+    assert sorted(target) == ['a', 'b', 'c']
+    assert target['a'] == 'abcd'
+    # Lists keep their last items.
+    assert target['b'] == [3, 4]
+    assert len(target['c']) == 2
+    assert limits.triggered == {
+        'max_keys': 1, 'max_items': 4, 'max_value_size': 1,
+    }
+
+
+@pytest.mark.parametrize("update", [deepupdate, frozenupdate])
+def test_limits_nested(update):
+    limits = Limits(max_keys=1, max_items=1)
+    target = {}
+    update(target, {'user': {'groups': [1, 2], 'name': 'toto'}}, limits)
+    update(target, {'user': {'name': 'toto'}}, limits)
+    assert target == {'user': {'groups': [2]}}
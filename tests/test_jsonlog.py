@@ -0,0 +1,103 @@
+import datetime
+import json
+import logging
+import sys
+
+import pytest
+
+from pylogctx import Deferred, LazyAccessor, context
+from pylogctx.jsonlog import JSONFormatter
+
+
+@pytest.fixture
+def record():
+    return logging.LogRecord('foo', logging.INFO, 'foo', 10, 'waagh %s', (1,),
+                             None)
+
+
+@pytest.fixture
+def clean_context():
+    yield context
+    del context._stack
+
+
+def test_json(record, clean_context):
+    formatter = JSONFormatter()
+    assert json.loads(formatter.format(record)) == {
+        'time': record.asctime, 'level': 'INFO', 'logger': 'foo',
+        'message': 'waagh 1',
+    }
+
+    context.update(rid=42, user={'groups': ['staff']}, tags={'a'},
+                   day=datetime.date(2018, 6, 1), level='ignored',
+                   obj=object)
+    fields = json.loads(formatter.format(record))
+    assert fields['rid'] == 42
+    assert fields['user'] == {'groups': ['staff']}
+    assert fields['tags'] == ['a']
+    assert fields['day'] == '2018-06-01'
+    # Record fields win.
+    assert fields['level'] == 'INFO'
+    assert fields['obj'] == str(object)
+
+
+def test_json_frozen(record, clean_context):
+    context.freeze = True
+    try:
+        context.update(user={'groups': ['staff'], 'tags': {'a'}})
+        fields = json.loads(JSONFormatter().format(record))
+    finally:
+        context.freeze = False
+    assert fields['user'] == {'groups': ['staff'], 'tags': ['a']}
+
+
+def test_json_cache(record, clean_context):
+    formatter = JSONFormatter(fields=['message'])
+    context.update(rid=42)
+    assert formatter.format(record) == '{"message":"waagh 1","rid":42}'
+    fragment = formatter._cache.fragment
+    formatter.format(record)
+    assert formatter._cache.fragment is fragment
+    context.update(rid=43)
+    assert formatter.format(record) == '{"message":"waagh 1","rid":43}'
+
+
+def test_json_lazy(record, clean_context):
+    class User(object):
+        name = 'toto'
+    user = User()
+    computed = []
+
+    formatter = JSONFormatter(fields=[('msg', 'message')])
+    context.update(name=LazyAccessor(user, 'name'),
+                   nested={'id': Deferred(lambda: computed.append(1) or 42)})
+    assert json.loads(formatter.format(record)) == {
+        'msg': 'waagh 1', 'name': 'toto', 'nested': {'id': 42}}
+    user.name = 'tata'
+    assert json.loads(formatter.format(record)) == {
+        'msg': 'waagh 1', 'name': 'tata', 'nested': {'id': 42}}
+    assert computed == [1]
+
+
+def test_json_serializers(record, clean_context):
+    class Point(object):
+        x, y = 1, 2
+
+    class Point3D(Point):
+        z = 3
+
+    formatter = JSONFormatter(fields=['message'], serializers={
+        Point: lambda point: [point.x, point.y],
+    })
+    context.update(point=Point3D())
+    assert json.loads(formatter.format(record))['point'] == [1, 2]
+
+
+def test_json_exc_info(clean_context):
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = logging.LogRecord('foo', logging.ERROR, 'foo', 10, 'failed',
+                                   (), sys.exc_info())
+    fields = json.loads(JSONFormatter().format(record))
+    assert 'ValueError: boom' in fields['exc_info']
@@ -0,0 +1,141 @@
+"""
+Conformance tests of context storages.
+
+Workers are generators, run concurrently by the runner of each storage and
+switching at each yield.
+"""
+import sys
+import threading
+import time
+
+import pytest
+
+from pylogctx.core import Context
+from pylogctx.storage import (
+    contextvars, greenlet, get_storage, storages, ContextVarStorage,
+    GreenletStorage, ThreadLocalStorage,
+)
+
+
+def run_threads(workers):
+    def run(worker):
+        for _ in worker:
+            time.sleep(0)
+
+    threads = [threading.Thread(target=run, args=(worker,))
+               for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_greenlets(workers):
+    def run(worker):
+        for _ in worker:
+            greenlet.getcurrent().parent.switch()
+
+    greenlets = [greenlet.greenlet(run) for worker in workers]
+    for greenlet_, worker in zip(greenlets, workers):
+        greenlet_.switch(worker)
+    while not all(greenlet_.dead for greenlet_ in greenlets):
+        for greenlet_ in greenlets:
+            if not greenlet_.dead:
+                greenlet_.switch()
+
+
+def run_tasks(workers):
+    from async_runner import run_tasks
+    run_tasks(workers)
+
+
+@pytest.fixture(params=[
+    (ThreadLocalStorage, run_threads),
+    pytest.param(
+        (ContextVarStorage, run_tasks),
+        marks=pytest.mark.skipif(
+            contextvars is None or sys.version_info < (3, 7),
+            reason='contextvars requires Python 3.7')),
+    pytest.param(
+        (GreenletStorage, run_greenlets),
+        marks=pytest.mark.skipif(greenlet is None,
+                                 reason='greenlet not installed')),
+], ids=['thread', 'contextvars', 'greenlet'])
+def backend(request):
+    storage_class, runner = request.param
+    return storage_class, runner
+
+
+def test_get_set(backend):
+    storage_class, _ = backend
+    storage = storage_class()
+    assert storage.get() is None
+    layer = object()
+    storage.set(layer)
+    assert storage.get() is layer
+    storage.set(None)
+    assert storage.get() is None
+
+
+def test_workers_isolated(backend):
+    storage_class, runner = backend
+    storage = storage_class()
+    context = Context(storage=storage)
+    context.update(main=True)
+    results = {}
+
+    def worker(i):
+        context.clear()
+        context.update(worker=i, tags=[i])
+        yield
+        with context(step=i, tags=[-i]):
+            yield
+            assert context.as_dict() == {
+                'worker': i, 'step': i, 'tags': [i, -i]}
+        yield
+        token = context.snapshot()
+        with context.isolated():
+            context.update(isolated=i)
+            yield
+            assert context.as_dict() == {'isolated': i}
+        assert context.snapshot() is token
+        yield
+        results[i] = context.as_dict()
+
+    runner([worker(i) for i in range(20)])
+    assert results == dict((i, {'worker': i, 'tags': [i]}) for i in range(20))
+    assert context.as_dict() == {'main': True}
+
+
+def test_snapshot_restore(backend):
+    storage_class, _ = backend
+    context = Context(storage=storage_class())
+    context.update(rid=42)
+    token = context.snapshot()
+    context.update(rid=43)
+    context.restore(token)
+    assert context.as_dict() == {'rid': 42}
+
+
+@pytest.mark.parametrize('name', sorted(storages))
+def test_get_storage(name):
+    storage_class = storages[name]
+    try:
+        storage = get_storage(name)
+    except RuntimeError:
+        pytest.skip('%s not available' % name)
+    assert isinstance(storage, storage_class)
+    assert get_storage(storage) is storage
+
+
+def test_get_storage_unknown():
+    with pytest.raises(ValueError):
+        get_storage('process')
+
+
+def test_set_storage():
+    context = Context(storage='thread')
+    assert isinstance(context.storage, ThreadLocalStorage)
+    context.update(rid=42)
+    context.set_storage(ThreadLocalStorage())
+    assert not context.as_dict()